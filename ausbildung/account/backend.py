@@ -1,13 +1,119 @@
+import hashlib
+import logging
+import time
+
+from django.conf import settings
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth.models import User
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+# Failed logins allowed per window, checked before the password is hashed
+LIMIT_WINDOW = 15 * 60
+LIMIT_IP = 30
+LIMIT_EMAIL = 10
+
+METRIKEN = ('fehlgeschlagen', 'gesperrt')
+METRIK_TIMEOUT = 60 * 60 * 24 * 30
 
 
 class EmailBackend(ModelBackend):
 
     def authenticate(self, email=None, password=None):
-        try:
-            user = User.objects.get(email__iexact=email.lower())
+        # Emails are stored in lowercase (see account.models), an exact
+        # lookup uses the index instead of scanning auth_user. The address
+        # is not unique, accounts which differed only in case share it.
+        for user in User.objects.filter(email=email.lower()):
             if user.check_password(password):
                 return user
-        except User.DoesNotExist:
-            return None
+        return None
+
+
+def client_ip(request):
+    """
+    Address of the client for the per-IP limit. Behind a reverse proxy
+    REMOTE_ADDR is the proxy's and shared by all users, the address is read
+    from ``LOGIN_IP_HEADER`` instead: every proxy appends the address it got
+    the request from, the entry added by the outermost of the
+    ``LOGIN_TRUSTED_PROXIES`` is the client. Anything left of it can be
+    forged. Returns None without a trusted address, only the per-email limit
+    applies then.
+    """
+    header = getattr(settings, 'LOGIN_IP_HEADER', None)
+    if not header:
+        return request.META.get('REMOTE_ADDR') or None
+
+    proxies = getattr(settings, 'LOGIN_TRUSTED_PROXIES', 1)
+    adressen = [adresse.strip() for adresse
+        in request.META.get(header, '').split(',') if adresse.strip()]
+    if proxies < 1 or len(adressen) < proxies:
+        return None
+    return adressen[-proxies]
+
+
+def limit_keys(ip, email):
+    """Returns (key prefix, limit) of the counters a login attempt counts to"""
+    keys = [('login.email.%s' % hashlib.md5(email.lower().encode('utf-8'))
+        .hexdigest(), LIMIT_EMAIL)]
+    if ip:
+        keys.append(('login.ip.%s' % ip, LIMIT_IP))
+    return keys
+
+
+def versuche(prefix):
+    """
+    Sliding window approximated by the counters of the current and the
+    previous window, the previous one weighted by how much of it still
+    overlaps the window ending now.
+    """
+    jetzt = time.time()
+    fenster = int(jetzt // LIMIT_WINDOW)
+    werte = cache.get_many(['%s.%d' % (prefix, fenster),
+        '%s.%d' % (prefix, fenster - 1)])
+    aktuell = werte.get('%s.%d' % (prefix, fenster), 0)
+    vorher = werte.get('%s.%d' % (prefix, fenster - 1), 0)
+    anteil = 1 - (jetzt % LIMIT_WINDOW) / LIMIT_WINDOW
+    return aktuell + vorher * anteil
+
+
+def zaehlen(key, timeout):
+    # incr fails on missing keys, add is a no-op if the key exists
+    cache.add(key, 0, timeout)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr
+        cache.set(key, 1, timeout)
+
+
+def metrik(name):
+    zaehlen('login.metrik.%s' % name, METRIK_TIMEOUT)
+
+
+def metriken():
+    """Counters of failed and blocked logins, e.g. for the monitoring"""
+    werte = cache.get_many(['login.metrik.%s' % name for name in METRIKEN])
+    return dict((name, werte.get('login.metrik.%s' % name, 0))
+        for name in METRIKEN)
+
+
+def login_gesperrt(ip, email):
+    """Whether further login attempts for ``email`` or from ``ip`` are blocked"""
+    for prefix, limit in limit_keys(ip, email):
+        if versuche(prefix) >= limit:
+            metrik('gesperrt')
+            logger.warning('Login blocked after too many failed attempts: %s',
+                prefix)
+            return True
+    return False
+
+
+def fehlversuch(ip, email):
+    """Counts a failed login of ``email`` from ``ip``"""
+    fenster = int(time.time() // LIMIT_WINDOW)
+    for prefix, limit in limit_keys(ip, email):
+        # Kept for two windows, the next one still reads it
+        zaehlen('%s.%d' % (prefix, fenster), 2 * LIMIT_WINDOW)
+    metrik('fehlgeschlagen')
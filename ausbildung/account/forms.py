@@ -1,9 +1,12 @@
+# encoding: utf-8
 
 from django import forms
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.utils.translation import ugettext_lazy as _
 
+from .backend import login_gesperrt, fehlversuch
+
 
 class EmailAuthenticationForm(forms.Form):
     """
@@ -29,6 +32,9 @@ class EmailAuthenticationForm(forms.Form):
         )
     )
 
+    # IP of the client for the rate limit, set by the login view
+    ip = None
+
     def __init__(self, request=None, *args, **kwargs):
         """
         If request is passed in, the form will validate that cookies are
@@ -45,8 +51,15 @@ class EmailAuthenticationForm(forms.Form):
         password = self.cleaned_data.get('password')
 
         if email and password:
+            # Checked before the password is hashed, a burst of attempts
+            # must not keep all workers busy
+            if login_gesperrt(self.ip, email):
+                raise forms.ValidationError(u'Zu viele fehlgeschlagene '
+                    u'Anmeldeversuche. Bitte versuche es später nochmals.')
+
             self.user_cache = authenticate(email=email, password=password)
             if self.user_cache is None:
+                fehlversuch(self.ip, email)
                 raise forms.ValidationError(
                     'Anmeldung fehlgeschlagen. Bitte nochmals probieren')
             elif not self.user_cache.is_active:
@@ -76,7 +89,7 @@ class RegistrationForm(forms.Form):
             }), max_length=75)
 
     def clean_email(self):
-        email = self.cleaned_data.get('email')
+        email = self.cleaned_data.get('email', '').lower()
         if email and User.objects.filter(email=email).exists():
             raise forms.ValidationError('Diese Email Adresse besteht bereits.')
         return email
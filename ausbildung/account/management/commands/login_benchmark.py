@@ -0,0 +1,68 @@
+# encoding: utf-8
+
+import random
+import timeit
+from optparse import make_option
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from ausbildung.account.backend import EmailBackend
+
+
+class Command(NoArgsCommand):
+    help = (u'Misst die Email-Abfrage und den ganzen Login mit vielen '
+            u'Benutzern. Die Benutzer werden in einer Transaktion erstellt, '
+            u'die am Ende zurückgerollt wird.')
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--benutzer', dest='benutzer', default='10000,50000',
+            help=u'Anzahl Benutzer pro Messung, mit Komma getrennt'),
+        make_option('--anzahl', type='int', dest='anzahl', default=200,
+            help=u'Abfragen pro Messung'),
+    )
+
+    @transaction.commit_manually
+    def handle_noargs(self, **options):
+        try:
+            groessen = [int(n) for n in options['benutzer'].split(',')]
+            self.messen(sorted(groessen), options['anzahl'])
+        finally:
+            transaction.rollback()
+
+    def messen(self, groessen, anzahl):
+        # One hash for all, hashing 50'000 passwords takes half an hour
+        passwort = make_password('geheim')
+        backend = EmailBackend()
+
+        self.stdout.write(u'%8s  %9s  %9s  %9s' % (
+            'Benutzer', 'iexact', 'exact', 'Login'))
+        erstellt = 0
+        for groesse in groessen:
+            User.objects.bulk_create([User(username='benchmark%d' % i,
+                email='benchmark%d@example.ch' % i, password=passwort)
+                for i in range(erstellt, groesse)])
+            erstellt = groesse
+
+            emails = ['benchmark%d@example.ch' % random.randrange(groesse)
+                for i in range(anzahl)]
+
+            def iexact():
+                for email in emails:
+                    list(User.objects.filter(email__iexact=email))
+
+            def exact():
+                for email in emails:
+                    list(User.objects.filter(email=email))
+
+            def login():
+                for email in emails[:10]:
+                    backend.authenticate(email=email, password='geheim')
+
+            self.stdout.write(u'%8d  %6.2f ms  %6.2f ms  %6.2f ms' % (
+                groesse,
+                timeit.Timer(iexact).timeit(1) / anzahl * 1000,
+                timeit.Timer(exact).timeit(1) / anzahl * 1000,
+                timeit.Timer(login).timeit(1) / 10 * 1000))
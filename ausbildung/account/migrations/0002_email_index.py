@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Accounts whose addresses only differ in case would share one
+        # address after lowercasing. They have to be cleaned up by hand,
+        # merging them here could hand over Anmeldungen to the wrong person.
+        if not db.dry_run:
+            konten = {}
+            for pk, email in orm['auth.User'].objects.exclude(email='') \
+                    .values_list('pk', 'email'):
+                konten.setdefault(email.lower(), []).append(pk)
+            doppelt = ["%s (%s)" % (email, ", ".join(str(pk) for pk in pks))
+                for email, pks in sorted(konten.items()) if len(pks) > 1]
+            if doppelt:
+                raise RuntimeError(
+                    "Cannot lowercase the email addresses, these accounts "
+                    "share an address apart from its case (user ids in "
+                    "parentheses):\n%s\nChange the address of all but one "
+                    "of them in the admin, then run the migration again."
+                    % "\n".join(doppelt))
+
+        # The logins look up the email with an exact match, the addresses
+        # are stored in lowercase from now on
+        db.execute('UPDATE auth_user SET email = LOWER(email)')
+        db.create_index('auth_user', ['email'])
+
+    def backwards(self, orm):
+        db.delete_index('auth_user', ['email'])
+
+    models = {
+        u'account.profil': {
+            'Meta': {'object_name': 'Profil'},
+            'abteilung': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['anmeldung.Abteilung']", 'null': 'True', 'blank': 'True'}),
+            'aktualisiert': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'bahnabo': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'default': "'Keines'", 'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'einheit': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'erstellt': ('django.db.models.fields.DateTimeField', [], {'auto_now': 'True', 'blank': 'True'}),
+            'erstsprache': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'default': "''", 'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'foto': ('sorl.thumbnail.fields.ImageField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'geburtsdatum': ('django.db.models.fields.DateField', [], {'null': 'True', 'blank': 'True'}),
+            'geschlecht': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'land': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'default': "'CH'", 'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'mobiltelefon': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'nationalitaet': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'default': "'CH'", 'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'ort': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'pfadiname': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'plz': ('django.db.models.fields.IntegerField', [], {'null': 'True', 'blank': 'True'}),
+            'schweinefleisch': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'strasse': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'stufe': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'telefon': ('ausbildung.anmeldung.fields.OptionalCharField', [], {'max_length': '100', 'null': 'True', 'blank': 'True'}),
+            'user': ('django.db.models.fields.related.OneToOneField', [], {'to': u"orm['auth.User']", 'unique': 'True'}),
+            'vegetarier': ('django.db.models.fields.BooleanField', [], {'default': 'False'})
+        },
+        u'anmeldung.abteilung': {
+            'Meta': {'object_name': 'Abteilung'},
+            'abteilungsleitung': ('django.db.models.fields.related.ManyToManyField', [], {'related_name': "'abteilungen'", 'symmetrical': 'False', 'through': u"orm['anmeldung.Abteilungsleitung']", 'to': u"orm['auth.User']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('ausbildung.anmeldung.fields.RequiredCharField', [], {'max_length': '100'}),
+            'region': ('ausbildung.anmeldung.fields.RequiredCharField', [], {'max_length': '100'}),
+            'schluessel': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '255'}),
+            'slug': ('autoslug.fields.AutoSlugField', [], {'unique': 'True', 'max_length': '50', 'populate_from': "'name'", 'unique_with': '()'}),
+            'verband': ('ausbildung.anmeldung.fields.RequiredCharField', [], {'default': "'ZH'", 'max_length': '100'})
+        },
+        u'anmeldung.abteilungsleitung': {
+            'Meta': {'object_name': 'Abteilungsleitung'},
+            'abteilung': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'leiter'", 'to': u"orm['anmeldung.Abteilung']"}),
+            'bis': ('django.db.models.fields.DateField', [], {'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'seit': ('django.db.models.fields.DateField', [], {'default': 'datetime.datetime.now'}),
+            'user': ('django.db.models.fields.related.ForeignKey', [], {'related_name': "'al'", 'to': u"orm['auth.User']"})
+        },
+        u'auth.group': {
+            'Meta': {'object_name': 'Group'},
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '80'}),
+            'permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'})
+        },
+        u'auth.permission': {
+            'Meta': {'ordering': "(u'content_type__app_label', u'content_type__model', u'codename')", 'unique_together': "((u'content_type', u'codename'),)", 'object_name': 'Permission'},
+            'codename': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'content_type': ('django.db.models.fields.related.ForeignKey', [], {'to': u"orm['contenttypes.ContentType']"}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '50'})
+        },
+        u'auth.user': {
+            'Meta': {'object_name': 'User'},
+            'date_joined': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'email': ('django.db.models.fields.EmailField', [], {'max_length': '75', 'blank': 'True'}),
+            'first_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'groups': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['auth.Group']", 'symmetrical': 'False', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'is_active': ('django.db.models.fields.BooleanField', [], {'default': 'True'}),
+            'is_staff': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'is_superuser': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'last_login': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now'}),
+            'last_name': ('django.db.models.fields.CharField', [], {'max_length': '30', 'blank': 'True'}),
+            'password': ('django.db.models.fields.CharField', [], {'max_length': '128'}),
+            'user_permissions': ('django.db.models.fields.related.ManyToManyField', [], {'to': u"orm['auth.Permission']", 'symmetrical': 'False', 'blank': 'True'}),
+            'username': ('django.db.models.fields.CharField', [], {'unique': 'True', 'max_length': '30'})
+        },
+        u'contenttypes.contenttype': {
+            'Meta': {'ordering': "('name',)", 'unique_together': "(('app_label', 'model'),)", 'object_name': 'ContentType', 'db_table': "'django_content_type'"},
+            'app_label': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'model': ('django.db.models.fields.CharField', [], {'max_length': '100'}),
+            'name': ('django.db.models.fields.CharField', [], {'max_length': '100'})
+        }
+    }
+
+    complete_apps = ['account']
\ No newline at end of file
@@ -1,8 +1,9 @@
 # encoding: utf-8
 
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save
 from django.dispatch import receiver
+from django.utils.timezone import now
 from django.contrib.auth.models import User
 
 from sorl.thumbnail import ImageField
@@ -57,37 +58,49 @@ class Profil(models.Model):
     )
 
 
-@receiver(post_save, sender=Anmeldung)
-def update_profile(sender, instance, *args, **kwargs):
-    a = instance
-    u = a.user
-    p, created = Profil.objects.get_or_create(user=a.user)
-
-    u.first_name = a.vorname
-    u.last_name = a.nachname
-    u.save()
+@receiver(pre_save, sender=User)
+def email_normalisieren(sender, instance, **kwargs):
+    # Emails are stored in lowercase, the logins and registrations look them
+    # up with an exact match which can use the index on auth_user.email
+    if instance.email:
+        instance.email = instance.email.lower()
 
-    p.pfadiname = a.pfadiname
-    p.geschlecht = a.geschlecht
-    p.geburtsdatum = a.geburtsdatum
 
-    p.foto = a.foto
-    p.strasse = a.strasse
-    p.plz = a.plz
-    p.ort = a.ort
-    p.land = a.land
+# Anmeldung fields which are copied into the profile of the user
+PROFIL_FELDER = (
+    'pfadiname', 'geschlecht', 'geburtsdatum', 'foto',
+    'strasse', 'plz', 'ort', 'land', 'telefon', 'mobiltelefon',
+    'abteilung', 'einheit', 'stufe',
+    'nationalitaet', 'erstsprache', 'bahnabo', 'vegetarier', 'schweinefleisch',
+)
 
-    p.telefon = a.telefon
-    p.mobiltelefon = a.mobiltelefon
 
-    p.abteilung = a.abteilung
-    p.einheit = a.einheit
-    p.stufe = a.stufe
-
-    p.nationalitaet = a.nationalitaet
-    p.erstsprache = a.erstsprache
-    p.bahnabo = a.bahnabo
+@receiver(post_save, sender=Anmeldung)
+def update_profile(sender, instance, *args, **kwargs):
+    a = instance
 
-    p.vegetarier = a.vegetarier
-    p.schweinefleisch = a.schweinefleisch
-    p.save()
+    # Most saves (payment, Notfallblatt received) don't change personal data,
+    # only write the columns that differ
+    User.objects.filter(pk=a.user_id) \
+        .exclude(first_name=a.vorname, last_name=a.nachname) \
+        .update(first_name=a.vorname, last_name=a.nachname)
+
+    werte = {}
+    for name in PROFIL_FELDER:
+        field = Anmeldung._meta.get_field(name)
+        werte[name] = field.get_prep_value(getattr(a, field.attname))
+
+    try:
+        alt = Profil.objects.filter(user=a.user_id).values(*PROFIL_FELDER)[0]
+    except IndexError:
+        p = Profil(user_id=a.user_id)
+        for name, wert in werte.items():
+            setattr(p, Profil._meta.get_field(name).attname, wert)
+        p.save()
+        return
+
+    geaendert = dict((name, wert) for name, wert in werte.items()
+        if wert != alt[name])
+    if geaendert:
+        geaendert['erstellt'] = now()
+        Profil.objects.filter(user=a.user_id).update(**geaendert)
@@ -0,0 +1,159 @@
+from django.contrib.auth.models import User
+from django.core.cache import get_cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from . import backend, forms
+from .backend import (LIMIT_WINDOW, LIMIT_EMAIL, LIMIT_IP, login_gesperrt,
+    fehlversuch, metriken, client_ip)
+from .forms import EmailAuthenticationForm
+
+
+LOCMEM = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'account-tests',
+    }
+}
+
+
+class Uhr(object):
+    """Replaces the time module in account.backend"""
+    def __init__(self, jetzt):
+        self.jetzt = jetzt
+
+    def time(self):
+        return self.jetzt
+
+
+@override_settings(CACHES=LOCMEM)
+class LoginLimitTest(TestCase):
+    def setUp(self):
+        # django.core.cache.cache is created on import, give the backend a
+        # cache from the overridden settings
+        self.cache, backend.cache = backend.cache, get_cache('default')
+        backend.cache.clear()
+
+        self.time = backend.time
+        self.uhr = backend.time = Uhr(1000.0 * LIMIT_WINDOW)
+
+        self.authenticate = forms.authenticate
+        self.aufrufe = []
+
+        def authenticate(**credentials):
+            self.aufrufe.append(credentials)
+            return None
+        forms.authenticate = authenticate
+
+    def tearDown(self):
+        backend.cache = self.cache
+        backend.time = self.time
+        forms.authenticate = self.authenticate
+
+    def anmelden(self, email, ip='10.0.0.1'):
+        form = EmailAuthenticationForm(data={'email': email,
+            'password': 'falsch'})
+        form.ip = ip
+        return form.is_valid()
+
+    def test_email(self):
+        for i in range(LIMIT_EMAIL):
+            fehlversuch('10.0.0.%d' % i, 'tn@example.ch')
+        self.assertTrue(login_gesperrt('10.0.1.1', 'TN@example.ch'))
+        self.assertFalse(login_gesperrt('10.0.1.1', 'al@example.ch'))
+
+    def test_ip(self):
+        for i in range(LIMIT_IP):
+            fehlversuch('10.0.0.1', 'tn%d@example.ch' % i)
+        self.assertTrue(login_gesperrt('10.0.0.1', 'neu@example.ch'))
+        self.assertFalse(login_gesperrt('10.0.0.2', 'neu@example.ch'))
+
+    def test_kein_hashing(self):
+        for i in range(LIMIT_EMAIL):
+            self.assertFalse(self.anmelden('tn@example.ch'))
+        self.assertEqual(len(self.aufrufe), LIMIT_EMAIL)
+
+        form = EmailAuthenticationForm(data={'email': 'tn@example.ch',
+            'password': 'falsch'})
+        self.assertFalse(form.is_valid())
+        self.assertIn('Zu viele', form.non_field_errors()[0])
+        self.assertEqual(len(self.aufrufe), LIMIT_EMAIL)
+
+        self.assertEqual(metriken(),
+            {'fehlgeschlagen': LIMIT_EMAIL, 'gesperrt': 1})
+
+    @override_settings(LOGIN_IP_HEADER='HTTP_X_FORWARDED_FOR',
+        LOGIN_TRUSTED_PROXIES=1)
+    def test_hinter_proxy(self):
+        # All requests come from the proxy, only the client is blocked
+        for i in range(LIMIT_IP):
+            self.client.post(reverse('login'), {
+                'email': 'tn%d@example.ch' % i,
+                'password': 'falsch',
+            }, REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='192.0.2.7')
+        self.assertTrue(login_gesperrt('192.0.2.7', 'neu@example.ch'))
+        self.assertFalse(login_gesperrt('192.0.2.8', 'neu@example.ch'))
+        self.assertFalse(login_gesperrt('10.0.0.1', 'neu@example.ch'))
+
+    def test_sliding_window(self):
+        for i in range(LIMIT_EMAIL):
+            fehlversuch(None, 'tn@example.ch')
+        self.assertTrue(login_gesperrt(None, 'tn@example.ch'))
+
+        # Right after the window ended the attempts still count in full
+        self.uhr.jetzt += LIMIT_WINDOW
+        self.assertTrue(login_gesperrt(None, 'tn@example.ch'))
+
+        # Half of the window later only half of them
+        self.uhr.jetzt += LIMIT_WINDOW / 2
+        self.assertFalse(login_gesperrt(None, 'tn@example.ch'))
+        for i in range(LIMIT_EMAIL / 2 - 1):
+            fehlversuch(None, 'tn@example.ch')
+        self.assertFalse(login_gesperrt(None, 'tn@example.ch'))
+        fehlversuch(None, 'tn@example.ch')
+        self.assertTrue(login_gesperrt(None, 'tn@example.ch'))
+
+        self.uhr.jetzt += 2 * LIMIT_WINDOW
+        self.assertFalse(login_gesperrt(None, 'tn@example.ch'))
+
+
+class ClientIpTest(TestCase):
+    def ip(self, **meta):
+        return client_ip(RequestFactory().post('/account/login/',
+            REMOTE_ADDR='10.0.0.1', **meta))
+
+    @override_settings(LOGIN_IP_HEADER='HTTP_X_FORWARDED_FOR',
+        LOGIN_TRUSTED_PROXIES=1)
+    def test_proxy(self):
+        self.assertEqual(self.ip(HTTP_X_FORWARDED_FOR='192.0.2.7'),
+            '192.0.2.7')
+        # Entries sent by the client itself are ignored
+        self.assertEqual(self.ip(
+            HTTP_X_FORWARDED_FOR='198.51.100.1, 192.0.2.7'), '192.0.2.7')
+        # Not the shared address of the proxy
+        self.assertIsNone(self.ip())
+
+    @override_settings(LOGIN_IP_HEADER='HTTP_X_FORWARDED_FOR',
+        LOGIN_TRUSTED_PROXIES=2)
+    def test_zwei_proxies(self):
+        self.assertEqual(self.ip(
+            HTTP_X_FORWARDED_FOR='198.51.100.1, 192.0.2.7, 10.0.0.2'),
+            '192.0.2.7')
+        self.assertIsNone(self.ip(HTTP_X_FORWARDED_FOR='10.0.0.2'))
+
+    @override_settings(LOGIN_IP_HEADER=None)
+    def test_ohne_proxy(self):
+        self.assertEqual(self.ip(HTTP_X_FORWARDED_FOR='192.0.2.7'),
+            '10.0.0.1')
+
+
+class EmailBackendTest(TestCase):
+    def test_gross_klein(self):
+        user = User.objects.create(username='tn', email='TN@Example.ch')
+        user.set_password('geheim')
+        user.save()
+        self.assertEqual(User.objects.get(pk=user.pk).email, 'tn@example.ch')
+        self.assertEqual(backend.EmailBackend().authenticate(
+            email='Tn@example.CH', password='geheim'), user)
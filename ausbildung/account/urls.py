@@ -1,9 +1,10 @@
 from django.conf.urls import patterns, url, include
 
-from .forms import EmailAuthenticationForm
-
 urlpatterns = patterns('ausbildung.account.views',
     url(r'^$', 'account', name="account"),
+    url(r'^login/$', 'login', {
+        'template_name': 'account/login.html',
+    }, name='login'),
 
     url(r'^register/$',
         'registration',
@@ -14,10 +15,6 @@ urlpatterns = patterns('ausbildung.account.views',
 )
 
 urlpatterns += patterns('django.contrib.auth.views',
-    url(r'^login/$', 'login', {
-        'template_name': 'account/login.html',
-        'authentication_form': EmailAuthenticationForm
-    }, name='login'),
     url(r'', include('django.contrib.auth.urls')),
 )
 
@@ -7,6 +7,8 @@ from django.template.loader import TemplateDoesNotExist, render_to_string
 from django.utils.http import int_to_base36
 from django.utils.translation import ugettext as _
 
+from ausbildung.outbox.models import Mail
+
 
 def get_signer(salt='email_registration'):
     """
@@ -18,7 +20,7 @@ def get_signer(salt='email_registration'):
 
 def send_registration_mail(email, request, user=None):
     """
-    Sends the registration mail
+    Queues the registration mail in the outbox
 
     * ``email``: The email address where the registration link should be
       sent to.
@@ -51,11 +53,12 @@ def send_registration_mail(email, request, user=None):
         get_current_site(request).domain,
         url)
 
-    render_to_mail('registration/email_registration_email', {
+    message = render_to_mail('registration/email_registration_email', {
         'url': url,
         },
         to=[email],
-        ).send()
+        )
+    Mail.objects.enqueue(message)
 
 
 class InvalidCode(Exception):
@@ -129,6 +132,10 @@ def render_to_mail(template, context, **kwargs):
         # representation.
         message = render_to_mail('myproject/hello_mail', {}, to=[email])
         message.send()
+
+        # Or queue it in the outbox, it is then sent by
+        # ``manage.py send_outbox``
+        Mail.objects.enqueue(message)
     """
     lines = iter(render_to_string('%s.txt' % template, context).splitlines())
 
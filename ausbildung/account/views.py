@@ -1,13 +1,15 @@
 from django.contrib import messages
+from django.contrib.auth import views as auth_views
 from django.contrib.auth.forms import SetPasswordForm
 from django.contrib.auth.models import User
 from django.shortcuts import redirect, render
 from django.utils.crypto import get_random_string
 from django.utils.translation import ugettext_lazy as _
 
+from .backend import client_ip
 from .signals import password_set
 from .utils import (InvalidCode, decode, send_registration_mail)
-from .forms import RegistrationForm
+from .forms import EmailAuthenticationForm, RegistrationForm
 
 
 def account(request):
@@ -21,6 +23,16 @@ def account(request):
     })
 
 
+def login(request, **kwargs):
+    # Django's login view creates the form without the request on POST, the
+    # rate limit needs the IP of the client
+    def form(*args, **form_kwargs):
+        form = EmailAuthenticationForm(*args, **form_kwargs)
+        form.ip = client_ip(request)
+        return form
+    return auth_views.login(request, authentication_form=form, **kwargs)
+
+
 def register(request):
     return render(request, 'account/register.html')
 
@@ -54,6 +66,7 @@ def registration_confirm(request, code, max_age=1800):
         return redirect('/')
 
     if not user:
+        email = email.lower()
         if User.objects.filter(email=email).exists():
             messages.error(request, 'Diese Email Adresse besteht bereits')
             return redirect('/')
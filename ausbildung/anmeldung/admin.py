@@ -1,7 +1,17 @@
 # encoding: utf-8
 
+import mimetypes
+import os
+
+from django.conf.urls import patterns, url
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.core.servers.basehttp import FileWrapper
+from django.core.exceptions import PermissionDenied
+from django.core.urlresolvers import reverse
 from django.db import models
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
 
 from sorl.thumbnail.admin import AdminImageMixin
 
@@ -10,7 +20,9 @@ from suit.widgets import SuitSplitDateTimeWidget
 import reversion
 
 from .models import (Kurs, Zusatzfeld, Abteilung, Abteilungsleitung, Anmeldung,
-    Notfallblatt, ALFeedback)
+    Notfallblatt, ALFeedback, Warteliste, Export)
+from .forms import AbteilungAdminForm, ZahlungenForm
+from .zahlungen import zahlungen_lesen, abgleichen
 
 import admin_actions as actions
 
@@ -20,10 +32,18 @@ class ZusatzfeldInline(admin.TabularInline):
     extra = 0
 
 
+class WartelisteInline(admin.TabularInline):
+    model = Warteliste
+    extra = 0
+    raw_id_fields = ('user',)
+    readonly_fields = ('eingetragen', 'nachgerueckt')
+
+
 class KursAdmin(reversion.VersionAdmin):
-    list_display = ('name', 'nummer', 'anmeldeschluss', 'von', 'bis')
+    list_display = ('name', 'nummer', 'anmeldeschluss', 'von', 'bis',
+        'kursplaetze', 'belegte_plaetze')
     search_fields = ('name', 'nummer', 'hauptleiter')
-    inlines = [ZusatzfeldInline]
+    inlines = [ZusatzfeldInline, WartelisteInline]
     prepopulated_fields = {'url': ('name',)}
     save_as = True
     #date_hierarchy = 'von'
@@ -35,6 +55,7 @@ class AbteilungsleitungInline(admin.StackedInline):
 
 
 class AbteilungAdmin(reversion.VersionAdmin):
+    form = AbteilungAdminForm
     list_display = ('name', 'region', 'verband')
     search_fields = ('name', 'region')
     readonly_fields = ('slug',)
@@ -87,6 +108,33 @@ class ALFeedbackInline(admin.StackedInline):
 
 
 
+class ZusatzfeldFilter(admin.SimpleListFilter):
+    title = 'Zusatzfeld angekreuzt'
+    parameter_name = 'zusatzfeld'
+
+    def lookups(self, request, model_admin):
+        felder = Zusatzfeld.objects.filter(typ='checkbox') \
+            .select_related('kurs')
+        if request.GET.get('kurs__id__exact'):
+            felder = felder.filter(kurs=request.GET['kurs__id__exact'])
+        return [(feld.pk, u'%s: %s' % (feld.kurs, feld.label))
+            for feld in felder]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(antworten__zusatzfeld=self.value(),
+                antworten__ja=True)
+
+
+class AnmeldungChangeList(ChangeList):
+    def get_query_set(self, request):
+        # Must come after the plain select_related() the ChangeList adds for
+        # the kurs column, it replaces it with the joins list_display needs.
+        qs = super(AnmeldungChangeList, self).get_query_set(request)
+        return qs.select_related('kurs', 'abteilung', 'alfeedback') \
+            .prefetch_related('antworten__zusatzfeld')
+
+
 class AnmeldungAdmin(AdminImageMixin, reversion.VersionAdmin):
     list_display = (
         'pfadiname',
@@ -122,17 +170,23 @@ class AnmeldungAdmin(AdminImageMixin, reversion.VersionAdmin):
     list_filter = (
         'bestaetigung',
         'kurs',
+        ZusatzfeldFilter,
     )
     list_search = ('pfadiname', 'vorname', 'nachname', 'email')
     actions = [
         actions.list_export,
+        actions.xlsx_export,
         actions.sportdb_export,
         actions.print_export,
         actions.print_confirmation,
-        actions.notfallblatt_export
+        actions.notfallblatt_export,
+        actions.bezahlt,
+        actions.anmeldung_erhalten,
+        actions.notfallblatt_erhalten,
     ]
     raw_id_fields = ('user', 'kurs',)
     inlines = (NotfallblattInline, ALFeedbackInline)
+    change_list_template = 'admin/anmeldung/anmeldung/change_list.html'
     readonly_fields = ['erstellt', 'aktualisiert']
     formfield_overrides = {
         models.DateTimeField: {'widget': SuitSplitDateTimeWidget},
@@ -198,6 +252,36 @@ class AnmeldungAdmin(AdminImageMixin, reversion.VersionAdmin):
         }),
     ]
 
+    def get_changelist(self, request, **kwargs):
+        return AnmeldungChangeList
+
+    def get_urls(self):
+        return patterns('',
+            url(r'^zahlungen/$',
+                self.admin_site.admin_view(self.zahlungen_view),
+                name='anmeldung_anmeldung_zahlungen'),
+        ) + super(AnmeldungAdmin, self).get_urls()
+
+    def zahlungen_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+
+        ergebnis = None
+        if request.method == 'POST':
+            form = ZahlungenForm(request.POST, request.FILES)
+            if form.is_valid():
+                zahlungen = zahlungen_lesen(form.cleaned_data['datei'])
+                ergebnis = abgleichen(zahlungen, request.user)
+        else:
+            form = ZahlungenForm()
+
+        return render(request, 'admin/anmeldung/zahlungen.html', {
+            'title': 'Zahlungen abgleichen',
+            'opts': self.model._meta,
+            'form': form,
+            'ergebnis': ergebnis,
+        })
+
     def geschlecht_kurz(self, obj):
         return 'm' if obj.geschlecht == '1' else 'w'
     geschlecht_kurz.short_description = 'Geschl.'
@@ -210,7 +294,7 @@ class AnmeldungAdmin(AdminImageMixin, reversion.VersionAdmin):
     def al_ok(self, obj):
         try:
             return obj.alfeedback.ok
-        except:
+        except ALFeedback.DoesNotExist:
             return None
     al_ok.short_description = 'AL OK'
     al_ok.admin_order_field = 'alfeedback__ok'
@@ -234,17 +318,64 @@ class AnmeldungAdmin(AdminImageMixin, reversion.VersionAdmin):
     zahlung.boolean = True
 
     def nothelfer(self, obj):
-        if obj.zusatz:
-            if 'nothelfer' in obj.zusatz:
-                return obj.zusatz['nothelfer']
-            if 'nothelferkurs' in obj.zusatz:
-                return obj.zusatz['nothelferkurs']
+        for antwort in obj.antworten.all():
+            if antwort.zusatzfeld.name in ('nothelfer', 'nothelferkurs'):
+                return antwort.wert
         return None
     nothelfer.short_description = 'Anm. NH'
     nothelfer.boolean = True
 
 
 
+class ExportAdmin(admin.ModelAdmin):
+    list_display = ('__unicode__', 'status', 'anzahl', 'user', 'fertig',
+        'download')
+    list_filter = ('typ', 'status')
+    readonly_fields = ('typ', 'status', 'anzahl', 'user', 'erstellt',
+        'gestartet', 'fertig', 'download', 'fehler')
+    fields = readonly_fields
+    actions = None
+
+    def has_add_permission(self, request):
+        return False
+
+    def anzahl(self, obj):
+        return len(obj.anmeldungen)
+    anzahl.short_description = 'Anmeldungen'
+
+    def download(self, obj):
+        if obj.status != Export.FERTIG:
+            return ''
+        return u'<a href="%s">%s</a>' % (
+            reverse('admin:anmeldung_export_download', args=(obj.pk,)),
+            os.path.basename(obj.datei.name))
+    download.allow_tags = True
+
+    def get_urls(self):
+        return patterns('',
+            url(r'^(\d+)/download/$',
+                self.admin_site.admin_view(self.download_view),
+                name='anmeldung_export_download'),
+        ) + super(ExportAdmin, self).get_urls()
+
+    def download_view(self, request, pk):
+        # Exports contain personal and medical data, staff status is not
+        # enough
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+
+        export = get_object_or_404(Export, pk=pk, status=Export.FERTIG)
+        filename = os.path.basename(export.datei.name)
+        content_type = mimetypes.guess_type(filename)[0]
+
+        export.datei.open('rb')
+        response = StreamingHttpResponse(FileWrapper(export.datei),
+            content_type=content_type or 'application/octet-stream')
+        response['Content-Disposition'] = 'attachment; filename=%s' % filename
+        return response
+
+
 admin.site.register(Abteilung, AbteilungAdmin)
 admin.site.register(Kurs, KursAdmin)
 admin.site.register(Anmeldung, AnmeldungAdmin)
+admin.site.register(Export, ExportAdmin)
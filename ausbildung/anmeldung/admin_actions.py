@@ -1,113 +1,422 @@
 # encoding: utf-8
 
+import hashlib
+import os
+import tempfile
 import unicodecsv
 
+from cStringIO import StringIO
 from datetime import date
+from numbers import Number
+from operator import attrgetter
 
+from openpyxl import Workbook
+from PyPDF2 import PdfFileReader, PdfFileWriter
+from xhtml2pdf import pisa
+
+from django.conf import settings
 from django.contrib.admin.util import lookup_field
-from django.http import HttpResponse
-from django.shortcuts import render
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models.fields import FieldDoesNotExist
+from django.shortcuts import redirect
+from django.template.loader import render_to_string
+from django.utils.datastructures import SortedDict
+from django.utils import simplejson as json
 from django.utils.encoding import force_unicode
+from django.utils.safestring import mark_safe
 from django.utils.timezone import now
 
-def csv_export(modeladmin, queryset, name, header, fields):
-    response = HttpResponse(mimetype='text/csv')
-    timestamp = now().strftime('%d%m%y_%H%M')
-    filename = '%s_%s.csv' % (name, timestamp)
-    response['Content-Disposition'] = 'attachment; filename=%s' % filename
-    writer = unicodecsv.writer(response, delimiter=';')
+import reversion
+
+from .models import Anmeldung, Export, Zusatzfeld, Notfallblatt, ALFeedback
+
+
+class Buffer(object):
+    """Pseudo file collecting the csv rows until they are streamed"""
+    def __init__(self):
+        self.rows = []
+
+    def write(self, value):
+        self.rows.append(value)
+
+    def flush(self):
+        content = ''.join(self.rows)
+        self.rows = []
+        return content
+
+
+def accessor(model, name):
+    """
+    Resolves ``name`` once per export to a function returning its value for
+    an object. Model fields are read directly, everything else goes through
+    ``lookup_field`` like in the changelist.
+    """
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return lambda obj: lookup_field(name, obj, None)[2]
+    return attrgetter(field.name)
+
+
+def serialize(value):
+    value = value if value is not None else ''
+    if type(value) == date:
+        value = value.strftime('%d.%m.%Y')
+    if type(value) == bool:
+        value = 1 if value else 0
+    return force_unicode(value).encode('utf-8')
+
+
+def chunks(queryset, size=500):
+    """
+    Yields the objects of ``queryset`` in lists of ``size``, ordered by
+    primary key, so only one chunk at a time is held in memory.
+    """
+    queryset = queryset.order_by('pk')
+    last = None
+    while True:
+        chunk = queryset if last is None else queryset.filter(pk__gt=last)
+        chunk = list(chunk[:size])
+        if not chunk:
+            break
+        yield chunk
+        last = chunk[-1].pk
+
+
+def csv_rows(queryset, header, fields):
+    accessors = [accessor(queryset.model, field) for field in fields]
+    buffer = Buffer()
+    writer = unicodecsv.writer(buffer, delimiter=';')
 
     writer.writerow([row for row in header])
+    yield buffer.flush()
+
+    for chunk in chunks(queryset):
+        for obj in chunk:
+            writer.writerow([serialize(a(obj)) for a in accessors] + [''])
+        yield buffer.flush()
+
+
+def csv_export(queryset, datei, header, fields):
+    for content in csv_rows(queryset, header, fields):
+        datei.write(content)
+
+
+# Rendered pages are cached for a week, changes create a new key anyway
+SEITEN_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def seite_key(template, anmeldung, pdf_template=None):
+    """
+    Cache key of the page of ``anmeldung`` rendered with ``template`` (and
+    converted to a PDF with ``pdf_template``, see seiten), it changes with
+    every modification of the Anmeldung, its Notfallblatt and the AL
+    feedback. The course and the Abteilung are printed as well, Abteilungen
+    have no timestamp, their printed fields are part of the key (merging
+    them only repoints the Anmeldungen). The date is part of the key
+    because the pages print the current date.
+    """
+    try:
+        notfallblatt = anmeldung.notfallblatt.aktualisiert
+    except Notfallblatt.DoesNotExist:
+        notfallblatt = None
+
+    try:
+        alfeedback = anmeldung.alfeedback.erstellt
+    except ALFeedback.DoesNotExist:
+        alfeedback = None
+
+    abteilung = anmeldung.abteilung
+    stand = json.dumps([template, pdf_template, anmeldung.pk,
+        anmeldung.erstellt, notfallblatt, alfeedback, anmeldung.kurs_id,
+        anmeldung.kurs.aktualisiert, abteilung.pk, abteilung.region,
+        abteilung.name, date.today()], cls=DjangoJSONEncoder)
+    return 'anmeldung.seite.%s' % hashlib.sha1(stand).hexdigest()
+
+
+def seiten(queryset, template, pdf_template=None):
+    """
+    Yields the page of every Anmeldung in ``queryset``, only the pages of
+    participants changed since the last export are rendered again. With
+    ``pdf_template`` every page is wrapped into that document template and
+    converted to a PDF on its own, the PDFs are cached instead.
+    """
+    queryset = queryset.select_related('kurs', 'abteilung', 'notfallblatt',
+        'alfeedback')
+    for chunk in chunks(queryset):
+        keys = SortedDict((seite_key(template, a, pdf_template), a)
+            for a in chunk)
+        cached = cache.get_many(keys.keys())
+
+        neu = {}
+        for key, anmeldung in keys.items():
+            if key not in cached:
+                seite = render_to_string(template, {
+                    'a': anmeldung,
+                    'STATIC_URL': settings.STATIC_URL,
+                })
+                if pdf_template and seite.strip():
+                    seite = pdf_rendern(render_to_string(pdf_template, {
+                        'seiten': mark_safe(seite),
+                        'STATIC_URL': settings.STATIC_URL,
+                    }))
+                cached[key] = neu[key] = seite
+            yield cached[key]
+        cache.set_many(neu, SEITEN_TIMEOUT)
+
+
+def pdf_pfad(uri, rel):
+    """Resolves the static and media urls of a page to files for xhtml2pdf"""
+    if uri.startswith(settings.MEDIA_URL):
+        return os.path.join(settings.MEDIA_ROOT,
+            uri[len(settings.MEDIA_URL):])
+    if uri.startswith(settings.STATIC_URL):
+        pfad = uri[len(settings.STATIC_URL):]
+        return finders.find(pfad) or os.path.join(settings.STATIC_ROOT, pfad)
+    return uri
+
+
+def pdf_rendern(html):
+    datei = StringIO()
+    ergebnis = pisa.CreatePDF(html.encode('utf-8'), dest=datei,
+        link_callback=pdf_pfad, encoding='utf-8')
+    if ergebnis.err:
+        raise ValueError('Das PDF konnte nicht erstellt werden')
+    return datei.getvalue()
+
+
+SPORTDB_HEADER = (
+    'NDBJS_PERS_NR',
+    'GESCHLECHT',
+    'NAME',
+    'VORNAME',
+    'GEB_DATUM',
+    'STRASSE',
+    'PLZ',
+    'ORT',
+    'LAND',
+    'NATIONALITAET',
+    'ERSTSPRACHE',
+    'KLASSE/GRUPPE'
+)
 
-    def serialize(obj, field):
-        f, attr, value = lookup_field(field, obj, modeladmin)
-        value = value if value is not None else ''
-        if type(value) == date:
-            value = value.strftime('%d.%m.%Y')
-        if type(value) == bool:
-            value = 1 if value else 0
-        return force_unicode(value).encode('utf-8')
+SPORTDB_FIELDS = (
+    'js',
+    'geschlecht',
+    'nachname',
+    'vorname',
+    'geburtsdatum',
+    'strasse',
+    'plz',
+    'ort',
+    'land',
+    'nationalitaet',
+    'erstsprache',
+)
 
-    for obj in queryset:
-        writer.writerow([serialize(obj, field) for field in fields] + [''])
+TN_FIELDS = (
+    'pfadiname',
+    'vorname',
+    'nachname',
+    'strasse',
+    'plz',
+    'ort',
+    'geschlecht',
+    'geburtsdatum',
+    'email',
+    'telefon',
+    'mobiltelefon',
+    'bahnabo',
+    'vegetarier',
+    'schweinefleisch',
+    'abteilung',
+    'einheit',
+    'stufe',
+    'anmeldung_erhalten',
+    'notfallblatt_erhalten',
+    'bezahlt',
+)
+
+
+def sportdb_csv(queryset, datei):
+    csv_export(queryset, datei, SPORTDB_HEADER, SPORTDB_FIELDS)
+
+
+def tn_csv(queryset, datei):
+    header = [f.upper() for f in TN_FIELDS]
+    queryset = queryset.select_related('abteilung')
+    csv_export(queryset, datei, header, TN_FIELDS)
+
+
+# Spreadsheet programs treat text starting with these as a formula
+FORMEL_ZEICHEN = ('=', '+', '-', '@')
+
+
+def xlsx_value(value):
+    if value is None or isinstance(value, (Number, date)):
+        return value
+    value = force_unicode(value)
+    # openpyxl writes strings starting with = as formulas, participants
+    # must not be able to put formulas into the admins' spreadsheets
+    if value.startswith(FORMEL_ZEICHEN):
+        value = u"'" + value
+    return value
+
+
+def tn_xlsx(queryset, datei):
+    """
+    The participant list as an Excel file, with one additional column per
+    Zusatzfeld of the selected courses. openpyxl's optimized writer keeps
+    the rows in a temporary file instead of building the sheet in memory.
+    """
+    accessors = [accessor(queryset.model, field) for field in TN_FIELDS]
+    header = [f.upper() for f in TN_FIELDS]
+
+    zusatzfelder = SortedDict()
+    for feld in Zusatzfeld.objects.filter(
+            kurs__in=queryset.values('kurs')).order_by('kurs', 'id'):
+        zusatzfelder.setdefault(feld.name, feld.label)
+    header.extend(zusatzfelder.values())
+
+    workbook = Workbook(optimized_write=True)
+    sheet = workbook.create_sheet(title='TN-Liste')
+    sheet.append(header)
+
+    for chunk in chunks(queryset.select_related('abteilung')):
+        for obj in chunk:
+            zusatz = obj.zusatz or {}
+            sheet.append([xlsx_value(a(obj)) for a in accessors] +
+                [xlsx_value(zusatz.get(name)) for name in zusatzfelder])
+
+    workbook.save(datei)
+
+
+def pdf_export(seite):
+    """
+    Renders the pages of the participants as PDFs (cached, see seiten) and
+    concatenates them into a single document.
+    """
+    def export(queryset, datei):
+        writer = PdfFileWriter()
+        for pdf in seiten(queryset, seite, 'anmeldung/pdf.html'):
+            if not pdf.strip():
+                # e.g. participants without a Notfallblatt
+                continue
+            for page in PdfFileReader(StringIO(pdf)).pages:
+                writer.addPage(page)
+        writer.write(datei)
+    return export
+
+
+# Export.typ -> (filename, renderer)
+EXPORTS = {
+    Export.SPORTDB: ('sportdb_%s.csv', sportdb_csv),
+    Export.TN_LISTE: ('tn_%s.csv', tn_csv),
+    Export.TN_EXCEL: ('tn_%s.xlsx', tn_xlsx),
+    Export.ANMELDUNGEN_PDF: ('anmeldungen_%s.pdf',
+        pdf_export('anmeldung/seiten/anmeldung.html')),
+    Export.BESTAETIGUNGEN_PDF: ('bestaetigungen_%s.pdf',
+        pdf_export('anmeldung/seiten/bestaetigung.html')),
+    Export.NOTFALLBLAETTER_PDF: ('notfallblaetter_%s.pdf',
+        pdf_export('anmeldung/seiten/notfallblatt.html')),
+}
+
+
+def export_erstellen(export):
+    """Renders ``export`` into its file, called by the exporte_erstellen command"""
+    filename, renderer = EXPORTS[export.typ]
+    with tempfile.TemporaryFile() as datei:
+        renderer(export.queryset(), datei)
+        datei.seek(0)
+        timestamp = export.erstellt.strftime('%d%m%y_%H%M')
+        export.datei.save(filename % timestamp, File(datei), save=False)
+
+
+def enqueue(modeladmin, request, queryset, typ):
+    export, created = Export.objects.enqueue(typ, queryset, request.user)
+    if created:
+        modeladmin.message_user(request,
+            u'Der Export wird im Hintergrund erstellt.')
+    else:
+        modeladmin.message_user(request,
+            u'Ein identischer Export existiert bereits.')
+    return redirect('admin:anmeldung_export_changelist')
 
-    return response
 
 def sportdb_export(modeladmin, request, queryset):
-    header = (
-        'NDBJS_PERS_NR',
-        'GESCHLECHT',
-        'NAME',
-        'VORNAME',
-        'GEB_DATUM',
-        'STRASSE',
-        'PLZ',
-        'ORT',
-        'LAND',
-        'NATIONALITAET',
-        'ERSTSPRACHE',
-        'KLASSE/GRUPPE'
-    )
-
-    fields = (
-        'js',
-        'geschlecht',
-        'nachname',
-        'vorname',
-        'geburtsdatum',
-        'strasse',
-        'plz',
-        'ort',
-        'land',
-        'nationalitaet',
-        'erstsprache',
-    )
-
-    return csv_export(modeladmin, queryset, 'sportdb', header, fields)
+    return enqueue(modeladmin, request, queryset, Export.SPORTDB)
 sportdb_export.short_description = 'Sportdb exportieren (CSV, UTF-8)'
 
 
 def list_export(modeladmin, request, queryset):
-    fields = (
-        'pfadiname',
-        'vorname',
-        'nachname',
-        'strasse',
-        'plz',
-        'ort',
-        'geschlecht',
-        'geburtsdatum',
-        'email',
-        'telefon',
-        'mobiltelefon',
-        'bahnabo',
-        'vegetarier',
-        'schweinefleisch',
-        'abteilung',
-        'einheit',
-        'stufe',
-        'anmeldung_erhalten',
-        'notfallblatt_erhalten',
-        'bezahlt',
-    )
-    header = [f.upper() for f in fields]
-    return csv_export(modeladmin, queryset, 'tn', header, fields)
+    return enqueue(modeladmin, request, queryset, Export.TN_LISTE)
 list_export.short_description = 'TN-Liste exportieren'
 
+def xlsx_export(modeladmin, request, queryset):
+    return enqueue(modeladmin, request, queryset, Export.TN_EXCEL)
+xlsx_export.short_description = 'TN-Liste exportieren (Excel)'
+
 def print_export(modeladmin, request, queryset):
-    return render(request, 'anmeldung/anmeldung_print.html', {
-        'anmeldungen': queryset
-    })
+    return enqueue(modeladmin, request, queryset, Export.ANMELDUNGEN_PDF)
 print_export.short_description = 'Anmeldungen Drucken'
 
 def print_confirmation(modeladmin, request, queryset):
-    return render(request, 'anmeldung/confirm_print.html', {
-        'anmeldungen': queryset
-    })
+    return enqueue(modeladmin, request, queryset, Export.BESTAETIGUNGEN_PDF)
 print_confirmation.short_description = u'Bestätigung drucken'
 
 def notfallblatt_export(modeladmin, request, queryset):
-    return render(request, 'anmeldung/notfallblatt_print.html', {
-        'anmeldungen': queryset
-    })
-notfallblatt_export.short_description = 'Notfallblätter Drucken'
\ No newline at end of file
+    return enqueue(modeladmin, request, queryset, Export.NOTFALLBLAETTER_PDF)
+notfallblatt_export.short_description = 'Notfallblätter Drucken'
+
+
+def daten_setzen(feld, daten, user, comment):
+    """
+    Sets ``feld`` of the Anmeldungen in ``daten`` (pk -> date) with one
+    UPDATE per date instead of saving every object, which would send the
+    signals and create a revision per Anmeldung. The change is recorded in
+    a single revision for all of them.
+    """
+    pks = {}
+    for pk, datum in daten.items():
+        pks.setdefault(datum, []).append(pk)
+
+    # update() bypasses auto_now, erstellt keeps the export fingerprints
+    # and the cached pages up to date
+    jetzt = now()
+    for datum, anmeldungen in pks.items():
+        Anmeldung.objects.filter(pk__in=anmeldungen) \
+            .update(**{feld: datum, 'erstellt': jetzt})
+
+    if daten:
+        # The revision follows the inlines, load them with the objects
+        anmeldungen = Anmeldung.objects.filter(pk__in=daten.keys()) \
+            .select_related('notfallblatt', 'alfeedback')
+        reversion.default_revision_manager.save_revision(list(anmeldungen),
+            user=user, comment=comment)
+
+
+def datum_setzen(feld, short_description):
+    """
+    Action setting ``feld`` to today for the selected Anmeldungen which
+    don't have a date yet.
+    """
+    def action(modeladmin, request, queryset):
+        pks = queryset.filter(**{feld: None}).values_list('pk', flat=True)
+        heute = date.today()
+        daten_setzen(feld, dict((pk, heute) for pk in pks), request.user,
+            u'%s: %s' % (short_description, heute.strftime('%d.%m.%Y')))
+        modeladmin.message_user(request,
+            u'%d Anmeldungen aktualisiert.' % len(pks))
+    action.__name__ = '%s_heute' % feld
+    action.short_description = short_description
+    return action
+
+
+bezahlt = datum_setzen('bezahlt', 'Als heute bezahlt markieren')
+anmeldung_erhalten = datum_setzen('anmeldung_erhalten',
+    'Anmeldung heute im Seki erhalten')
+notfallblatt_erhalten = datum_setzen('notfallblatt_erhalten',
+    'Notfallblatt heute im Seki erhalten')
@@ -37,10 +37,42 @@ class JSONFormField(Field):
         return value
 
 
-class JSONFieldBase(models.Field):
+class JSONDescriptor(object):
+    """
+    Keeps the JSON string as loaded from the database and only decodes it
+    when the attribute is read for the first time.
+
+    The first value set on an instance is the one loaded from the database
+    (or passed to the constructor), it is kept separately from the values
+    assigned later, e.g. the JSON string of a ModelForm, so changes can be
+    detected for both strings and decoded values.
+    """
+    def __init__(self, field):
+        self.field = field
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            raise AttributeError('Can only be accessed via an instance.')
+
+        data = instance.__dict__
+        if self.field.attname not in data:
+            raw = data.get(self.field.raw_attname)
+            data[self.field.attname] = self.field.to_python(raw)
+        return data[self.field.attname]
+
+    def __set__(self, instance, value):
+        data = instance.__dict__
+        raw = isinstance(value, basestring) or value is None
+        if self.field.db_attname not in data:
+            data[self.field.db_attname] = value if raw else None
+        if raw:
+            data[self.field.raw_attname] = value
+            data.pop(self.field.attname, None)
+        else:
+            data[self.field.attname] = value
+
 
-    # Used so to_python() is called
-    __metaclass__ = models.SubfieldBase
+class JSONFieldBase(models.Field):
 
     def __init__(self, *args, **kwargs):
         self.dump_kwargs = kwargs.pop('dump_kwargs', {
@@ -51,6 +83,12 @@ class JSONFieldBase(models.Field):
 
         super(JSONFieldBase, self).__init__(*args, **kwargs)
 
+    def contribute_to_class(self, cls, name):
+        super(JSONFieldBase, self).contribute_to_class(cls, name)
+        self.raw_attname = '_%s_json' % self.attname
+        self.db_attname = '_%s_db' % self.attname
+        setattr(cls, self.name, JSONDescriptor(self))
+
     def to_python(self, value):
         """Convert string value to JSON"""
         if isinstance(value, basestring):
@@ -60,6 +98,31 @@ class JSONFieldBase(models.Field):
                 pass
         return value
 
+    def has_changed(self, instance):
+        """
+        Whether the value of ``instance`` differs from the one loaded from
+        or last saved to the database.
+        """
+        data = instance.__dict__
+        gespeichert = data.get(self.db_attname)
+        if self.attname in data:
+            wert = data[self.attname]
+        elif data.get(self.raw_attname) == gespeichert:
+            # Neither read nor assigned since it was loaded
+            return False
+        else:
+            wert = self.to_python(data.get(self.raw_attname))
+        return wert != self.to_python(gespeichert)
+
+    def pre_save(self, model_instance, add):
+        """Only serialize the value again if it has been changed"""
+        data = model_instance.__dict__
+        if self.has_changed(model_instance):
+            data[self.raw_attname] = self.get_db_prep_value(
+                getattr(model_instance, self.attname), connection=None)
+            data[self.db_attname] = data[self.raw_attname]
+        return data.get(self.raw_attname)
+
     def get_db_prep_value(self, value, connection, prepared=False):
         """Convert JSON object to a string"""
 
@@ -13,11 +13,36 @@ class AbteilungForm(forms.ModelForm):
         exclude = ('abteilungsleitung',)
 
     def save(self, *args, **kwargs):
-        # Dont' save if an exact copy already exist
+        # Don't save if the same Abteilung already exists, the unique key
+        # makes concurrent registrations end up with the same one too
+        abteilung, created = Abteilung.objects.get_or_create(
+            schluessel=Abteilung.schluessel_fuer(**self.cleaned_data),
+            defaults=self.cleaned_data)
+        return abteilung
+
+
+class AbteilungAdminForm(forms.ModelForm):
+    class Meta:
+        model = Abteilung
+        exclude = ('abteilungsleitung',)
+
+    def clean(self):
+        # The key isn't editable, validate_unique doesn't check it
+        data = super(AbteilungAdminForm, self).clean()
         try:
-            return Abteilung.objects.get(**self.cleaned_data)
-        except Abteilung.DoesNotExist:
-            return super(AbteilungForm, self).save(*args, **kwargs)
+            schluessel = Abteilung.schluessel_fuer(data['verband'],
+                data['region'], data['name'])
+        except KeyError:
+            return data
+
+        andere = Abteilung.objects.filter(schluessel=schluessel) \
+            .exclude(pk=self.instance.pk)
+        if andere.exists():
+            raise ValidationError(u'Die Abteilung %s existiert bereits. '
+                u'Doppelte Abteilungen können mit "manage.py '
+                u'abteilungen_zusammenfuehren" zusammengeführt werden.'
+                % andere[0])
+        return data
 
 
 class AnmeldungForm(forms.ModelForm):
@@ -32,10 +57,10 @@ class AnmeldungForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super(AnmeldungForm, self).__init__(*args, **kwargs)
+        choices = Abteilung.objects.choices()
         if not self.instance.id:
-            choices = tuple(self.fields['abteilung'].choices)
-            choices += (('andere', 'Andere Abteilung'),)
-            self.fields['abteilung'].choices = choices
+            choices = choices + [('andere', 'Andere Abteilung')]
+        self.fields['abteilung'].choices = choices
 
     def clean_tos(self):
         tos = self.cleaned_data.get('tos', False)
@@ -85,3 +110,9 @@ class ALFeedbackForm(forms.ModelForm):
             'kontaktperson': forms.TextInput(attrs=BLOCKINPUT),
             'mobiltelefon': forms.TextInput(attrs=BLOCKINPUT),
         }
+
+
+class ZahlungenForm(forms.Form):
+    datei = forms.FileField(label='Datei',
+        help_text=u'CSV-Export der Zahlungen mit den Spalten Datum, Betrag '
+                  u'und Mitteilung, getrennt durch Strichpunkte')
@@ -0,0 +1,30 @@
+# encoding: utf-8
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from ausbildung.anmeldung.models import Abteilung
+
+
+class Command(BaseCommand):
+    args = '<ziel_id> <abteilung_id abteilung_id ...>'
+    help = (u'Führt doppelt erfasste Abteilungen in der ersten zusammen. '
+            u'Anmeldungen, Profile und Abteilungsleitungen der anderen '
+            u'werden auf sie umgehängt, danach werden die anderen gelöscht.')
+
+    def handle(self, *args, **options):
+        if len(args) < 2:
+            raise CommandError(u'Ziel und mindestens eine Abteilung angeben')
+
+        try:
+            ziel = Abteilung.objects.get(pk=args[0])
+            abteilungen = [Abteilung.objects.get(pk=pk) for pk in args[1:]
+                if pk != args[0]]
+        except (Abteilung.DoesNotExist, ValueError) as e:
+            raise CommandError(e)
+
+        with transaction.commit_on_success():
+            Abteilung.objects.zusammenfuehren(ziel, abteilungen)
+
+        for abteilung in abteilungen:
+            self.stdout.write(u'%s -> %s' % (abteilung, ziel))
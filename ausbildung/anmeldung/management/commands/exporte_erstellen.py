@@ -0,0 +1,68 @@
+# encoding: utf-8
+
+import time
+import traceback
+
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+from django.utils.timezone import now
+
+from ausbildung.anmeldung.admin_actions import export_erstellen
+from ausbildung.anmeldung.models import Export
+
+
+class Command(NoArgsCommand):
+    help = (u'Erstellt die im Admin angeforderten Exporte und löscht alte '
+            u'Exporte. Per cron oder mit --loop als Worker ausführen.')
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--loop', action='store_true', dest='loop', default=False,
+            help='Nicht beenden, sondern auf neue Exporte warten'),
+        make_option('--interval', type='int', dest='interval', default=5,
+            help='Wartezeit in Sekunden im --loop Modus'),
+    )
+
+    def handle_noargs(self, **options):
+        while True:
+            self.aufraeumen()
+            while self.erstellen():
+                pass
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def aufraeumen(self):
+        for export in Export.objects.filter(
+                erstellt__lt=now() - Export.AUFBEWAHRUNG):
+            export.delete()
+
+        Export.objects.abgebrochen().update(status=Export.FEHLER,
+            fehler=u'Abgebrochen, der Export wurde nicht rechtzeitig fertig.')
+
+    def erstellen(self):
+        wartend = Export.objects.filter(status=Export.WARTEND)
+        try:
+            export = wartend.order_by('erstellt')[0]
+        except IndexError:
+            return False
+
+        # Another worker was faster
+        export.gestartet = now()
+        if not wartend.filter(pk=export.pk).update(status=Export.LAEUFT,
+                gestartet=export.gestartet):
+            return True
+        export.status = Export.LAEUFT
+
+        try:
+            export_erstellen(export)
+        except Exception:
+            export.status = Export.FEHLER
+            export.fehler = traceback.format_exc()
+            self.stderr.write(u'%s: %s' % (export, export.fehler))
+        else:
+            export.status = Export.FERTIG
+            export.fertig = now()
+        export.save()
+        return True
@@ -0,0 +1,59 @@
+# encoding: utf-8
+
+import timeit
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import NoArgsCommand
+from django.template import Context, Template
+from django.template.loader import get_template
+
+from ausbildung.anmeldung.forms import AnmeldungForm
+from ausbildung.templatetags import bootstrap
+
+
+VORLAGEN = (
+    (u'Feld für Feld', '{% load bootstrap %}'
+        '{% for field in form %}{{ field|bootstrap }}{% endfor %}'),
+    (u'Ganzes Formular', '{% load bootstrap %}{{ form|bootstrap }}'),
+)
+
+
+class Command(NoArgsCommand):
+    help = (u'Misst, wie lange das Anmeldeformular mit dem bootstrap Filter '
+            u'zum Rendern braucht: mit den einmal geladenen Templates und '
+            u'mit get_template für jedes Feld (wie früher).')
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--anzahl', type='int', dest='anzahl', default=50,
+            help=u'Anzahl Durchläufe pro Messung'),
+    )
+
+    def handle_noargs(self, **options):
+        if settings.TEMPLATE_DEBUG:
+            self.stderr.write(u'TEMPLATE_DEBUG ist eingeschaltet, die '
+                u'Templates werden nicht zwischengespeichert.')
+
+        # The cached loader of the production settings already keeps the
+        # compiled templates, the difference shows with the plain loaders
+        self.stdout.write(u'Template Loader: %s' % u', '.join(
+            loader[0] if isinstance(loader, tuple) else loader
+            for loader in settings.TEMPLATE_LOADERS))
+
+        anzahl = options['anzahl']
+        context = Context({'form': AnmeldungForm()})
+        laden = bootstrap.get_bootstrap_template
+
+        for name, quelle in VORLAGEN:
+            vorlage = Template(quelle)
+            for modus, funktion in (('get_template', get_template),
+                                    ('einmal geladen', laden)):
+                bootstrap.get_bootstrap_template = funktion
+                try:
+                    vorlage.render(context)
+                    dauer = timeit.Timer(
+                        lambda: vorlage.render(context)).timeit(anzahl)
+                finally:
+                    bootstrap.get_bootstrap_template = laden
+                self.stdout.write(u'%s, %s: %.1f ms' % (
+                    name, modus, dauer / anzahl * 1000))
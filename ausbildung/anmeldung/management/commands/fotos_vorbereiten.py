@@ -0,0 +1,56 @@
+# encoding: utf-8
+
+from datetime import timedelta
+from optparse import make_option
+
+from django.core.management.base import NoArgsCommand
+from django.utils.timezone import now
+
+from sorl.thumbnail import get_thumbnail
+
+from ausbildung.account.models import Profil
+from ausbildung.anmeldung.models import Anmeldung
+
+
+# The sizes used by the {% thumbnail %} tags in the templates, keep in sync
+GEOMETRIEN = (
+    '250x250',  # seiten/anmeldung.html, seiten/notfallblatt.html
+    '250x200',  # print.html, seiten/bestaetigung.html
+    '100x100',  # anmeldung/form.html
+)
+
+
+class Command(NoArgsCommand):
+    help = (u'Erstellt die Thumbnails der TN-Fotos im Voraus, damit die '
+            u'Druckansichten sie nur noch im Key-Value-Store nachschlagen.')
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--minuten', type='int', dest='minuten', default=None,
+            help=u'Nur Fotos von Anmeldungen und Profilen, die in den '
+                 u'letzten MINUTEN geändert wurden (für den cron job)'),
+    )
+
+    def handle_noargs(self, **options):
+        anmeldungen = Anmeldung.objects.exclude(foto='')
+        profile = Profil.objects.exclude(foto='')
+
+        if options['minuten'] is not None:
+            seit = now() - timedelta(minutes=options['minuten'])
+            anmeldungen = anmeldungen.filter(erstellt__gte=seit)
+            profile = profile.filter(erstellt__gte=seit)
+
+        # The profile usually points to the same file as the Anmeldung
+        fotos = set(anmeldungen.values_list('foto', flat=True))
+        fotos.update(profile.values_list('foto', flat=True))
+        fotos.discard(None)
+
+        for foto in sorted(fotos):
+            for geometrie in GEOMETRIEN:
+                try:
+                    get_thumbnail(foto, geometrie)
+                except Exception as e:
+                    self.stderr.write(u'%s (%s): %s' % (foto, geometrie, e))
+                    break
+
+        if int(options['verbosity']) > 1:
+            self.stdout.write(u'%d Fotos vorbereitet' % len(fotos))
@@ -0,0 +1,25 @@
+# encoding: utf-8
+
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from ausbildung.anmeldung.models import Kurs
+
+
+class Command(NoArgsCommand):
+    help = (u'Gleicht Kurs.belegte_plaetze mit der effektiven Anzahl '
+            u'Anmeldungen und reservierten Plätzen der Warteliste ab. '
+            u'Periodisch (z.Bsp. per cron) ausführen.')
+
+    def handle_noargs(self, **options):
+        for pk in Kurs.objects.values_list('pk', flat=True):
+            with transaction.commit_on_success():
+                kurs = Kurs.objects.select_for_update().get(pk=pk)
+                anzahl = kurs.anmeldungen.count() + \
+                    kurs.warteliste.nachgerueckt().count()
+                if kurs.belegte_plaetze == anzahl:
+                    continue
+
+                Kurs.objects.filter(pk=pk).update(belegte_plaetze=anzahl)
+                self.stdout.write(u'%s: %d -> %d' % (
+                    kurs, kurs.belegte_plaetze, anzahl))
@@ -0,0 +1,30 @@
+# encoding: utf-8
+
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from ausbildung.anmeldung.models import Kurs, Warteliste
+
+
+class Command(NoArgsCommand):
+    help = (u'Gibt abgelaufene Reservationen der Warteliste frei und lässt '
+            u'für alle freien Plätze die nächsten Einträge nachrücken. '
+            u'Periodisch (z.Bsp. per cron) ausführen.')
+
+    def handle_noargs(self, **options):
+        abgelaufen = Warteliste.objects.nachgerueckt().filter(
+            nachgerueckt__lt=now() - Warteliste.FRIST)
+
+        for eintrag in abgelaufen:
+            with transaction.commit_on_success():
+                # Frees the seat and moves the next entry up, see
+                # models.reservation_freigeben
+                eintrag.delete()
+            self.stdout.write(u'Abgelaufen: %s' % eintrag)
+
+        kurse = Kurs.objects.filter(warteliste__nachgerueckt__isnull=True)
+        for pk in kurse.distinct().values_list('pk', flat=True):
+            with transaction.commit_on_success():
+                for eintrag in Kurs.objects.nachruecken(pk):
+                    self.stdout.write(u'Nachgerückt: %s' % eintrag)
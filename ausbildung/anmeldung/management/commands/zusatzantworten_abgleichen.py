@@ -0,0 +1,18 @@
+# encoding: utf-8
+
+from django.core.management.base import NoArgsCommand
+from django.db import transaction
+
+from ausbildung.anmeldung.models import Anmeldung, Zusatzantwort
+
+
+class Command(NoArgsCommand):
+    help = (u'Erstellt die Zusatzantworten aller Anmeldungen neu aus den '
+            u'Zusatzdaten, z.Bsp. nach dem Umbenennen eines Zusatzfelds.')
+
+    def handle_noargs(self, **options):
+        anmeldungen = Anmeldung.objects.exclude(zusatz=None) \
+            .only('id', 'kurs', 'zusatz')
+        for anmeldung in anmeldungen.iterator():
+            with transaction.commit_on_success():
+                Zusatzantwort.objects.synchronisieren(anmeldung)
@@ -1,17 +1,41 @@
 # encoding: utf-8
 
+import hashlib
+import os
+
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+from uuid import uuid4
+
 from django import forms
+from django.contrib.sites.models import Site
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.urlresolvers import reverse
 from django.db import models
+from django.db.models import F, Max, Q
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
 from django.utils.timezone import now
 from django.template.defaultfilters import slugify
+from django.template.loader import render_to_string
+from django.utils import simplejson as json
 
 from autoslug import AutoSlugField
 
 from sorl.thumbnail import ImageField
 
+from ausbildung import pagecache
+from ausbildung.outbox.utils import send_mail
+
 from .fields import RequiredCharField, OptionalCharField, JSONField
 
 
+# Kurs id -> (version, ZusatzForm class), see Kurs.zusatzform
+_zusatzformen = {}
+
+
 class KursManager(models.Manager):
     def open(self):
         return self.get_query_set().filter(anmeldeschluss__gte=now())
@@ -19,6 +43,52 @@ class KursManager(models.Manager):
     def online(self):
         return self.filter(online=True)
 
+    def platz_belegen(self, kurs_id):
+        self.filter(pk=kurs_id).update(
+            belegte_plaetze=F('belegte_plaetze') + 1)
+
+    def platz_reservieren(self, kurs_id):
+        """
+        Takes a free seat of the course, returns False if it is fully
+        booked. The check and the increment are a single UPDATE, two
+        registrations can't both get the last seat even where
+        ``select_for_update`` doesn't lock (SQLite).
+        """
+        frei = Q(kursplaetze__isnull=True) | Q(kursplaetze=0) | \
+            Q(belegte_plaetze__lt=F('kursplaetze'))
+        return bool(self.filter(frei, pk=kurs_id).update(
+            belegte_plaetze=F('belegte_plaetze') + 1))
+
+    def platz_freigeben(self, kurs_id):
+        self.filter(pk=kurs_id, belegte_plaetze__gt=0).update(
+            belegte_plaetze=F('belegte_plaetze') - 1)
+
+    def nachruecken(self, kurs_id):
+        """
+        Reserves the free seats of a course for the first entries on its
+        waiting list and notifies their users.
+        """
+        try:
+            kurs = self.select_for_update().get(pk=kurs_id)
+        except Kurs.DoesNotExist:
+            return []
+
+        if kurs.kursplaetze:
+            frei = kurs.freie_plaetze
+            if frei <= 0:
+                return []
+        else:
+            frei = None
+
+        eintraege = list(kurs.warteliste.wartend().select_related('user')[:frei])
+        for eintrag in eintraege:
+            self.platz_belegen(kurs.pk)
+            eintrag.nachgerueckt = now()
+            eintrag.save()
+            eintrag.benachrichtigen()
+
+        return eintraege
+
 class Kurs(models.Model):
 
     online = models.BooleanField('Online', help_text='Auf Webseite anzeigen',
@@ -49,6 +119,11 @@ class Kurs(models.Model):
     kursplaetze = models.IntegerField(u'Kursplätze', blank=True, null=True,
         help_text='Maximale Anzahl Teilnehmer')
 
+    # Denormalized number of Anmeldungen, kept up to date by the signals
+    # below and corrected by ``manage.py kursplaetze_abgleichen``.
+    belegte_plaetze = models.PositiveIntegerField(u'Belegte Plätze',
+        default=0, editable=False)
+
     teilnehmer = models.ManyToManyField('auth.User', through='Anmeldung',
         related_name="angemeldete_kurse")
 
@@ -62,19 +137,41 @@ class Kurs(models.Model):
     def __unicode__(self):
         return u'%s %d' % (self.name, self.von.year)
 
+    def save(self, *args, **kwargs):
+        # belegte_plaetze is only changed with F() updates, never write back
+        # the possibly outdated value of this instance.
+        if self.pk and not kwargs.get('force_insert') and \
+                kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [f.name for f in self._meta.local_fields
+                if not f.primary_key and f.name != 'belegte_plaetze']
+        super(Kurs, self).save(*args, **kwargs)
+
     @property
     def freie_plaetze(self):
         if self.kursplaetze:
-            return self.kursplaetze - self.teilnehmer.count()
+            return self.kursplaetze - self.belegte_plaetze
         else:
             return u'Unbeschränkt'
 
+    @property
+    def ausgebucht(self):
+        return bool(self.kursplaetze) and self.freie_plaetze <= 0
+
     def zusatzform(self):
+        # The generated class is cached per process. Kurs.aktualisiert is the
+        # version stamp, it is touched whenever a Zusatzfeld changes (see
+        # zusatzfelder_geaendert below).
+        version, form = _zusatzformen.get(self.pk, (None, None))
+        if version == self.aktualisiert:
+            return form
+
         felder = {}
         for feld in self.zusatzfelder.all():
             felder[feld.name] = feld.form_field()
 
-        return type('ZusatzForm', (forms.Form,), felder)
+        form = type('ZusatzForm', (forms.Form,), felder)
+        _zusatzformen[self.pk] = (self.aktualisiert, form)
+        return form
 
 
 class Zusatzfeld(models.Model):
@@ -119,6 +216,38 @@ class Zusatzfeld(models.Model):
         return self.label
 
 
+class AbteilungManager(models.Manager):
+    CHOICES_KEY = 'anmeldung.abteilung.choices'
+
+    def choices(self):
+        """
+        Choices for the abteilung select, grouped by region. Cached until an
+        Abteilung is changed (see abteilungen_geaendert).
+        """
+        choices = cache.get(self.CHOICES_KEY)
+        if choices is None:
+            abteilungen = self.order_by('region', 'name') \
+                .values_list('region', 'pk', 'name')
+            choices = [('', '---------')] + [
+                (region, [(pk, name) for _, pk, name in gruppe])
+                for region, gruppe in groupby(abteilungen, itemgetter(0))]
+            cache.set(self.CHOICES_KEY, choices, 60 * 60 * 24)
+        return choices
+
+    def zusammenfuehren(self, ziel, abteilungen):
+        """
+        Merges ``abteilungen`` into ``ziel``: everything pointing to them
+        (Anmeldungen, Profile, Abteilungsleitungen) is moved to ``ziel``,
+        then they are deleted.
+        """
+        pks = [abteilung.pk for abteilung in abteilungen]
+        for related in self.model._meta.get_all_related_objects():
+            name = related.field.name
+            related.model._default_manager \
+                .filter(**{'%s__in' % name: pks}).update(**{name: ziel})
+        self.filter(pk__in=pks).delete()
+
+
 class Abteilung(models.Model):
 
     verband = RequiredCharField('Kantonalverband', default='ZH')
@@ -127,9 +256,15 @@ class Abteilung(models.Model):
 
     slug = AutoSlugField(populate_from='name', unique=True)
 
+    # Normalized verband, region and name, identifies an Abteilung
+    schluessel = models.CharField(max_length=255, unique=True,
+        editable=False)
+
     abteilungsleitung = models.ManyToManyField('auth.User',
         through='Abteilungsleitung', related_name='abteilungen')
 
+    objects = AbteilungManager()
+
     class Meta:
         verbose_name = 'Abteilung'
         verbose_name_plural = 'Abteilungen'
@@ -137,6 +272,17 @@ class Abteilung(models.Model):
     def __unicode__(self):
         return u'%s - %s' % (self.region, self.name)
 
+    @staticmethod
+    def schluessel_fuer(verband, region, name):
+        """Case and whitespace insensitive key of an Abteilung"""
+        teile = (verband, region, name)
+        return u'|'.join(u' '.join(teil.split()).lower() for teil in teile)
+
+    def save(self, *args, **kwargs):
+        self.schluessel = self.schluessel_fuer(self.verband, self.region,
+            self.name)
+        super(Abteilung, self).save(*args, **kwargs)
+
 
 class Abteilungsleitung(models.Model):
 
@@ -261,18 +407,24 @@ class Anmeldung(models.Model):
     def __unicode__(self):
         return u'%s %s v/o %s' % (self.vorname, self.nachname, self.pfadiname)
 
+    @property
+    def zahlungsreferenz(self):
+        # Read by the payment reconciliation, see zahlungen.py
+        return u'A-%05d' % self.pk
+
     def tr_class(self):
         try:
-            print self.alfeedback
             if self.alfeedback.ok:
                 return 'success'
             else:
                 return 'error'
-        except:
+        except ALFeedback.DoesNotExist:
             return 'warning'
 
 class Notfallblatt(models.Model):
     anmeldung = models.OneToOneField(Anmeldung)
+    aktualisiert = models.DateTimeField('Aktualisiert', auto_now=True,
+        null=True)
 
     # Kontaktperson während dem Lager
     kontakt = RequiredCharField('Voller Name',
@@ -356,3 +508,343 @@ class ALFeedback(models.Model):
 
     def __unicode__(self):
         return u'Bestätgung für %s von %s' % (self.anmeldung, self.user)
+
+
+class ZusatzantwortManager(models.Manager):
+    def synchronisieren(self, anmeldung):
+        """
+        Replaces the answers of ``anmeldung`` with the ones in its
+        ``zusatz`` data, matched to the Zusatzfelder of the course by name.
+        """
+        self.filter(anmeldung=anmeldung).delete()
+
+        zusatz = anmeldung.zusatz or {}
+        antworten = []
+        for feld in Zusatzfeld.objects.filter(kurs=anmeldung.kurs_id):
+            if zusatz.get(feld.name) is None:
+                continue
+            antwort = Zusatzantwort(anmeldung=anmeldung, zusatzfeld=feld)
+            try:
+                antwort.wert = zusatz[feld.name]
+            except (TypeError, ValueError):
+                # Answer from before the type of the field was changed
+                continue
+            antworten.append(antwort)
+        self.bulk_create(antworten)
+
+
+class Zusatzantwort(models.Model):
+    """
+    The answers of the ``Anmeldung.zusatz`` data in a queryable form, kept
+    in sync when the Anmeldung is saved (see zusatz_synchronisieren).
+    """
+
+    anmeldung = models.ForeignKey(Anmeldung, related_name='antworten')
+    zusatzfeld = models.ForeignKey(Zusatzfeld, related_name='antworten')
+
+    # Only the column matching the type of the Zusatzfeld is set
+    text = models.TextField('Text', blank=True)
+    zahl = models.IntegerField('Zahl', blank=True, null=True)
+    ja = models.NullBooleanField('Ja')
+
+    objects = ZusatzantwortManager()
+
+    class Meta:
+        verbose_name = 'Zusatzantwort'
+        verbose_name_plural = 'Zusatzantworten'
+        unique_together = ('anmeldung', 'zusatzfeld')
+        index_together = [
+            ['zusatzfeld', 'ja'],
+            ['zusatzfeld', 'zahl'],
+        ]
+
+    def __unicode__(self):
+        return u'%s: %s' % (self.zusatzfeld.label, self.wert)
+
+    def _get_wert(self):
+        if self.zusatzfeld.typ == 'checkbox':
+            return self.ja
+        if self.zusatzfeld.typ == 'integer':
+            return self.zahl
+        return self.text
+
+    def _set_wert(self, wert):
+        if self.zusatzfeld.typ == 'checkbox':
+            self.ja = bool(wert)
+        elif self.zusatzfeld.typ == 'integer':
+            self.zahl = int(wert)
+        else:
+            self.text = unicode(wert)
+
+    wert = property(_get_wert, _set_wert)
+
+
+class WartelisteManager(models.Manager):
+    def wartend(self):
+        return self.filter(nachgerueckt__isnull=True)
+
+    def nachgerueckt(self):
+        return self.filter(nachgerueckt__isnull=False)
+
+    def eintragen(self, kurs, user):
+        """
+        Appends ``user`` to the waiting list of ``kurs``. The course must be
+        loaded with ``select_for_update`` to keep the positions unique.
+        """
+        try:
+            return self.get(kurs=kurs, user=user)
+        except Warteliste.DoesNotExist:
+            letzte = self.filter(kurs=kurs).aggregate(
+                position=models.Max('position'))['position']
+            return self.create(kurs=kurs, user=user,
+                position=(letzte or 0) + 1)
+
+
+class Warteliste(models.Model):
+
+    # How long a seat stays reserved for a promoted entry
+    FRIST = timedelta(days=5)
+
+    kurs = models.ForeignKey(Kurs, related_name='warteliste')
+    user = models.ForeignKey('auth.User', related_name='wartelisten')
+
+    position = models.PositiveIntegerField('Position')
+
+    eingetragen = models.DateTimeField('Eingetragen', auto_now_add=True)
+    nachgerueckt = models.DateTimeField(u'Nachgerückt', blank=True, null=True,
+        help_text=u'Seit wann ein Platz für diesen Eintrag reserviert ist')
+
+    objects = WartelisteManager()
+
+    class Meta:
+        verbose_name = 'Wartelisteneintrag'
+        verbose_name_plural = 'Warteliste'
+        ordering = ('kurs', 'position')
+        unique_together = (('kurs', 'user'), ('kurs', 'position'))
+
+    def __unicode__(self):
+        return u'%d. %s auf der Warteliste von %s' % (
+            self.position, self.user, self.kurs)
+
+    @property
+    def frist(self):
+        if self.nachgerueckt:
+            return self.nachgerueckt + self.FRIST
+
+    def vor_dir(self):
+        return self.kurs.warteliste.wartend().filter(
+            position__lt=self.position).count()
+
+    def benachrichtigen(self):
+        url = 'http://%s%s' % (Site.objects.get_current().domain,
+            reverse('anmeldung_form', kwargs={'kurs': self.kurs.url}))
+
+        subject = u'Freier Platz im %s' % self.kurs
+        message = render_to_string('anmeldung/warteliste_email.txt',
+            {'eintrag': self, 'kurs': self.kurs, 'url': url})
+        send_mail(subject, message, 'anmeldung@aure4.ch', [self.user.email])
+
+
+class ExportManager(models.Manager):
+    def fingerprint(self, typ, queryset):
+        """
+        Identifies the export of ``queryset`` in its current state: the
+        selected Anmeldungen and their last modification.
+        """
+        pks = sorted(queryset.values_list('pk', flat=True))
+        stand = queryset.aggregate(
+            anmeldung=Max('erstellt'),
+            notfallblatt=Max('notfallblatt__aktualisiert'),
+            alfeedback=Max('alfeedback__erstellt'))
+        data = json.dumps([typ, pks, stand['anmeldung'],
+            stand['notfallblatt'], stand['alfeedback']],
+            cls=DjangoJSONEncoder)
+        return hashlib.sha1(data).hexdigest(), pks
+
+    def abgebrochen(self):
+        """
+        Jobs claimed by a worker which didn't finish them in time, e.g.
+        because it was killed during a deploy.
+        """
+        grenze = now() - Export.TIMEOUT
+        # Jobs claimed before gestartet existed only have erstellt
+        return self.filter(status=Export.LAEUFT).filter(
+            Q(gestartet__lt=grenze) | Q(gestartet=None, erstellt__lt=grenze))
+
+    def enqueue(self, typ, queryset, user):
+        """
+        Returns a tuple of the export job for ``queryset`` and whether it has
+        been created. Identical exports are only rendered once.
+        """
+        fingerprint, pks = self.fingerprint(typ, queryset)
+        aktiv = self.exclude(status=Export.FEHLER).exclude(
+            pk__in=self.abgebrochen().values('pk'))
+        try:
+            return aktiv.filter(typ=typ,
+                fingerprint=fingerprint).order_by('-erstellt')[0], False
+        except IndexError:
+            return self.create(typ=typ, fingerprint=fingerprint,
+                anmeldungen=pks, user=user), True
+
+
+def export_pfad(instance, filename):
+    # Exports contain personal data, don't make the url guessable
+    return os.path.join('exporte', uuid4().hex, filename)
+
+
+class Export(models.Model):
+
+    SPORTDB = 'sportdb'
+    TN_LISTE = 'tn'
+    TN_EXCEL = 'tn_xlsx'
+    ANMELDUNGEN_PDF = 'anmeldungen_pdf'
+    BESTAETIGUNGEN_PDF = 'bestaetigungen_pdf'
+    NOTFALLBLAETTER_PDF = 'notfallblaetter_pdf'
+
+    TYP_CHOICES = (
+        (SPORTDB, 'Sportdb (CSV)'),
+        (TN_LISTE, 'TN-Liste (CSV)'),
+        (TN_EXCEL, 'TN-Liste (Excel)'),
+        (ANMELDUNGEN_PDF, 'Anmeldungen (PDF)'),
+        (BESTAETIGUNGEN_PDF, u'Bestätigungen (PDF)'),
+        (NOTFALLBLAETTER_PDF, u'Notfallblätter (PDF)'),
+    )
+
+    WARTEND = 'wartend'
+    LAEUFT = 'laeuft'
+    FERTIG = 'fertig'
+    FEHLER = 'fehler'
+
+    STATUS_CHOICES = (
+        (WARTEND, 'Wartend'),
+        (LAEUFT, u'Läuft'),
+        (FERTIG, 'Fertig'),
+        (FEHLER, 'Fehler'),
+    )
+
+    # Exports are deleted after this time by ``manage.py exporte_erstellen``
+    AUFBEWAHRUNG = timedelta(days=7)
+
+    # Running jobs older than this are considered failed
+    TIMEOUT = timedelta(hours=1)
+
+    typ = RequiredCharField('Typ', choices=TYP_CHOICES)
+    status = RequiredCharField('Status', choices=STATUS_CHOICES,
+        default=WARTEND, db_index=True)
+    fingerprint = models.CharField(max_length=40, db_index=True)
+    anmeldungen = JSONField('Anmeldungen')
+
+    datei = models.FileField('Datei', upload_to=export_pfad, blank=True,
+        null=True, max_length=255)
+    fehler = models.TextField('Fehler', blank=True)
+
+    user = models.ForeignKey('auth.User', verbose_name='Erstellt von',
+        blank=True, null=True)
+    erstellt = models.DateTimeField('Erstellt', auto_now_add=True)
+    gestartet = models.DateTimeField('Gestartet', blank=True, null=True)
+    fertig = models.DateTimeField('Fertig', blank=True, null=True)
+
+    objects = ExportManager()
+
+    class Meta:
+        verbose_name = 'Export'
+        verbose_name_plural = 'Exporte'
+        ordering = ('-erstellt',)
+
+    def __unicode__(self):
+        return u'%s vom %s' % (self.get_typ_display(),
+            self.erstellt.strftime('%d.%m.%Y %H:%M'))
+
+    def queryset(self):
+        return Anmeldung.objects.filter(pk__in=self.anmeldungen)
+
+
+@receiver(pre_save, sender=Anmeldung)
+def kurs_gewechselt(sender, instance, **kwargs):
+    # Staff can move a participant to another course in the admin
+    instance._alter_kurs_id = None
+    if instance.pk:
+        alt = Anmeldung.objects.filter(pk=instance.pk) \
+            .values_list('kurs_id', flat=True)
+        if alt and alt[0] != instance.kurs_id:
+            instance._alter_kurs_id = alt[0]
+
+
+@receiver(post_save, sender=Anmeldung)
+def platz_belegen(sender, instance, created, **kwargs):
+    if created:
+        # Registrations reserve their seat before saving (see views)
+        if not getattr(instance, '_platz_reserviert', False):
+            Kurs.objects.platz_belegen(instance.kurs_id)
+    elif getattr(instance, '_alter_kurs_id', None):
+        Kurs.objects.platz_freigeben(instance._alter_kurs_id)
+        Kurs.objects.nachruecken(instance._alter_kurs_id)
+        Kurs.objects.platz_belegen(instance.kurs_id)
+
+
+@receiver(pre_save, sender=Anmeldung)
+def zusatz_geaendert(sender, instance, **kwargs):
+    field = Anmeldung._meta.get_field('zusatz')
+    instance._zusatz_geaendert = field.has_changed(instance)
+
+
+@receiver(post_save, sender=Anmeldung)
+def zusatz_synchronisieren(sender, instance, created, **kwargs):
+    if created or instance._zusatz_geaendert:
+        Zusatzantwort.objects.synchronisieren(instance)
+
+
+@receiver(post_delete, sender=Anmeldung)
+def platz_freigeben(sender, instance, **kwargs):
+    Kurs.objects.platz_freigeben(instance.kurs_id)
+    Kurs.objects.nachruecken(instance.kurs_id)
+
+
+@receiver(pre_save, sender=Kurs)
+def kursplaetze_erhoeht(sender, instance, **kwargs):
+    # Only more seats let the waiting list move up, other changes of the
+    # course must not lock it
+    instance._kursplaetze_erhoeht = False
+    if instance.pk:
+        alt = Kurs.objects.filter(pk=instance.pk) \
+            .values_list('kursplaetze', flat=True)
+        if alt and alt[0] is not None and (instance.kursplaetze is None
+                or instance.kursplaetze > alt[0]):
+            instance._kursplaetze_erhoeht = True
+
+
+@receiver(post_save, sender=Kurs)
+def kursplaetze_geaendert(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_kursplaetze_erhoeht', False):
+        Kurs.objects.nachruecken(instance.pk)
+
+
+@receiver(post_save, sender=Kurs)
+@receiver(post_delete, sender=Kurs)
+def kurs_geaendert(sender, instance, **kwargs):
+    pagecache.invalidate()
+
+
+@receiver(post_save, sender=Abteilung)
+@receiver(post_delete, sender=Abteilung)
+def abteilungen_geaendert(sender, instance, **kwargs):
+    cache.delete(AbteilungManager.CHOICES_KEY)
+
+
+@receiver(post_save, sender=Zusatzfeld)
+@receiver(post_delete, sender=Zusatzfeld)
+def zusatzfelder_geaendert(sender, instance, **kwargs):
+    Kurs.objects.filter(pk=instance.kurs_id).update(aktualisiert=now())
+
+
+@receiver(post_delete, sender=Warteliste)
+def reservation_freigeben(sender, instance, **kwargs):
+    if instance.nachgerueckt:
+        Kurs.objects.platz_freigeben(instance.kurs_id)
+        Kurs.objects.nachruecken(instance.kurs_id)
+
+
+@receiver(post_delete, sender=Export)
+def export_datei_loeschen(sender, instance, **kwargs):
+    if instance.datei:
+        instance.datei.delete(save=False)
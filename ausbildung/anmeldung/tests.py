@@ -0,0 +1,498 @@
+# encoding: utf-8
+
+import threading
+
+from cStringIO import StringIO
+from datetime import date, timedelta
+from decimal import Decimal
+from zipfile import ZipFile
+
+from PyPDF2 import PdfFileReader
+
+from django.contrib import admin
+from django.contrib.auth.models import Permission, User
+from django.core.cache import get_cache
+from django.core.management import call_command
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.client import Client, RequestFactory
+from django.test.utils import override_settings
+from django.utils.timezone import now
+from django.utils.unittest import skipIf
+
+from . import admin_actions
+from .admin import AnmeldungAdmin
+from .admin_actions import seite_key, tn_xlsx
+from .forms import AbteilungAdminForm
+from .zahlungen import Zahlung, abgleichen
+from .models import (Kurs, Zusatzfeld, Abteilung, Abteilungsleitung,
+    Anmeldung, ALFeedback, Zusatzantwort, Export, Warteliste)
+
+
+# The cache session engine of the settings needs a running memcached
+SESSIONS = 'django.contrib.sessions.backends.signed_cookies'
+
+
+def kurs_erstellen(**kwargs):
+    daten = {
+        'name': 'Basiskurs',
+        'url': 'basiskurs',
+        'von': date(2030, 4, 1),
+        'bis': date(2030, 4, 7),
+        'anmeldeschluss': date(2030, 3, 1),
+    }
+    daten.update(kwargs)
+    return Kurs.objects.create(**daten)
+
+
+def abteilung_erstellen(name='Glockenhof'):
+    return Abteilung.objects.create(region=u'Zürich', name=name)
+
+
+def anmeldung_erstellen(kurs, user, **kwargs):
+    daten = {
+        'kurs': kurs,
+        'user': user,
+        'pfadiname': 'Pfiff',
+        'vorname': 'Hans',
+        'nachname': 'Muster',
+        'geschlecht': '1',
+        'geburtsdatum': date(2000, 1, 1),
+        'strasse': 'Bahnhofstrasse 1',
+        'plz': 8001,
+        'ort': u'Zürich',
+        'email': 'hans@example.ch',
+        'einheit': 'Trupp',
+        'stufe': 'pfadi',
+    }
+    daten.update(kwargs)
+    if 'abteilung' not in daten:
+        daten['abteilung'] = abteilung_erstellen()
+    return Anmeldung.objects.create(**daten)
+
+
+def user_erstellen(name, **kwargs):
+    return User.objects.create(username=name,
+        email='%s@example.ch' % name, **kwargs)
+
+
+def einloggen(client, user):
+    user.set_password('geheim')
+    user.save()
+    return client.login(email=user.email, password='geheim')
+
+
+def anmeldungen_erstellen(kurse, abteilung, anzahl):
+    """``anzahl`` Anmeldungen spread over ``kurse``, without the signals"""
+    User.objects.bulk_create([User(username='tn%d' % i,
+        email='tn%d@example.ch' % i) for i in range(anzahl)])
+    users = User.objects.filter(username__startswith='tn').order_by('pk')
+    vorlage = anmeldung_erstellen(kurse[0], user_erstellen('vorlage'),
+        abteilung=abteilung)
+    anmeldungen = []
+    for i, user in enumerate(users):
+        anmeldung = Anmeldung.objects.get(pk=vorlage.pk)
+        anmeldung.pk = None
+        anmeldung.kurs = kurse[i % len(kurse)]
+        anmeldung.user = user
+        anmeldungen.append(anmeldung)
+    Anmeldung.objects.bulk_create(anmeldungen)
+
+    bestaetigt = Anmeldung.objects.filter(abteilung=abteilung)[:anzahl / 2]
+    ALFeedback.objects.bulk_create([ALFeedback(anmeldung=anmeldung,
+        user=vorlage.user, mitteilung='ok', kontaktperson='AL')
+        for anmeldung in bestaetigt])
+
+
+class ZusatzantwortTest(TestCase):
+    def setUp(self):
+        self.kurs = kurs_erstellen()
+        self.nothelfer = Zusatzfeld.objects.create(kurs=self.kurs,
+            typ='checkbox', label='Nothelfer')
+        self.anmeldung = anmeldung_erstellen(self.kurs, user_erstellen('tn'),
+            zusatz={'nothelfer': True})
+
+    def antworten(self):
+        return list(Zusatzantwort.objects.filter(anmeldung=self.anmeldung)
+            .values_list('ja', flat=True))
+
+    def test_erstellen(self):
+        self.assertEqual(self.antworten(), [True])
+
+    def test_admin_formular(self):
+        request = RequestFactory().get('/')
+        request.user = user_erstellen('admin', is_staff=True,
+            is_superuser=True)
+        modeladmin = AnmeldungAdmin(Anmeldung, admin.site)
+        Form = modeladmin.get_form(request, self.anmeldung, fields=['zusatz'])
+
+        anmeldung = Anmeldung.objects.get(pk=self.anmeldung.pk)
+        form = Form({'zusatz': '{"nothelfer": false}'}, instance=anmeldung)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+        self.assertEqual(self.antworten(), [False])
+        self.assertEqual(Anmeldung.objects.get(pk=self.anmeldung.pk).zusatz,
+            {'nothelfer': False})
+
+    def test_unveraendert(self):
+        anmeldung = Anmeldung.objects.get(pk=self.anmeldung.pk)
+        anmeldung.zusatz = '{"nothelfer":true}'
+        self.assertFalse(
+            Anmeldung._meta.get_field('zusatz').has_changed(anmeldung))
+
+
+def formular_daten(abteilung):
+    """POST data of the registration form"""
+    return {
+        'pfadiname': 'Pfiff',
+        'vorname': 'Hans',
+        'nachname': 'Muster',
+        'geschlecht': '1',
+        'geburtsdatum': '01.01.2000',
+        'strasse': 'Bahnhofstrasse 1',
+        'plz': '8001',
+        'ort': 'Zürich',
+        'land': 'CH',
+        'email': 'hans@example.ch',
+        'abteilung': abteilung.pk,
+        'einheit': 'Trupp',
+        'stufe': 'pfadi',
+        'nationalitaet': 'CH',
+        'erstsprache': 'D',
+        'bahnabo': 'Keines',
+        'tos': 'on',
+    }
+
+
+@override_settings(SESSION_ENGINE=SESSIONS)
+class AnmeldungFormTest(TestCase):
+    def setUp(self):
+        self.kurs = kurs_erstellen(kursplaetze=1)
+        self.daten = formular_daten(abteilung_erstellen())
+        self.url = reverse('anmeldung_form', kwargs={'kurs': self.kurs.url})
+
+    def anmelden(self, name):
+        client = Client()
+        self.assertTrue(einloggen(client, user_erstellen(name)))
+        return client.post(self.url, self.daten)
+
+    def test_ausgebucht(self):
+        self.assertEqual(self.anmelden('tn1').status_code, 302)
+        response = self.anmelden('tn2')
+        self.assertTemplateUsed(response, 'anmeldung/fully_booked.html')
+
+        self.assertEqual(Anmeldung.objects.filter(kurs=self.kurs).count(), 1)
+        self.assertEqual(Kurs.objects.get(pk=self.kurs.pk).belegte_plaetze, 1)
+
+    def test_nachgerueckt(self):
+        self.anmelden('tn1')
+        wartend = user_erstellen('wartend')
+        Warteliste.objects.create(kurs=self.kurs, user=wartend, position=1)
+        Anmeldung.objects.get(kurs=self.kurs).delete()
+
+        # The reserved seat is taken by the user of the waiting list
+        self.assertEqual(self.anmelden('tn2').status_code, 200)
+        client = Client()
+        self.assertTrue(einloggen(client, wartend))
+        self.assertEqual(client.post(self.url, self.daten).status_code, 302)
+
+        self.assertFalse(Warteliste.objects.exists())
+        self.assertEqual(Kurs.objects.get(pk=self.kurs.pk).belegte_plaetze, 1)
+
+
+@skipIf(connection.vendor == 'sqlite'
+    and not connection.settings_dict.get('TEST_NAME'),
+    'The threads need a test database on disk, set TEST_NAME')
+@override_settings(SESSION_ENGINE=SESSIONS)
+class ParalleleAnmeldungenTest(TransactionTestCase):
+    """
+    Concurrent registrations must not book more seats than available. The
+    threads don't share SQLite's in-memory test database, run it against
+    PostgreSQL or with ``TEST_NAME`` set for SQLite.
+    """
+    ANMELDUNGEN = 8
+    PLAETZE = 3
+
+    def test_parallel(self):
+        kurs = kurs_erstellen(kursplaetze=self.PLAETZE)
+        daten = formular_daten(abteilung_erstellen())
+        clients = []
+        for i in range(self.ANMELDUNGEN):
+            client = Client()
+            self.assertTrue(einloggen(client, user_erstellen('tn%d' % i)))
+            clients.append(client)
+
+        url = reverse('anmeldung_form', kwargs={'kurs': kurs.url})
+        start = threading.Event()
+
+        def anmelden(client):
+            try:
+                start.wait()
+                client.post(url, daten)
+            finally:
+                # Every thread has its own connection
+                connection.close()
+
+        threads = [threading.Thread(target=anmelden, args=(client,))
+            for client in clients]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(Anmeldung.objects.filter(kurs=kurs).count(),
+            self.PLAETZE)
+        self.assertEqual(Kurs.objects.get(pk=kurs.pk).belegte_plaetze,
+            self.PLAETZE)
+
+
+@override_settings(SESSION_ENGINE=SESSIONS)
+class ExportTest(TestCase):
+    def setUp(self):
+        kurs = kurs_erstellen()
+        anmeldung_erstellen(kurs, user_erstellen('tn'))
+        self.queryset = Anmeldung.objects.filter(kurs=kurs)
+        self.user = user_erstellen('admin')
+
+        # The cached pages are checked, don't depend on a running memcached
+        self.cache, admin_actions.cache = admin_actions.cache, get_cache(
+            'django.core.cache.backends.locmem.LocMemCache')
+
+    def tearDown(self):
+        admin_actions.cache = self.cache
+        # Deletes the files, the transaction rollback doesn't
+        for export in Export.objects.all():
+            export.delete()
+
+    def test_identisch(self):
+        export, created = Export.objects.enqueue(Export.TN_LISTE,
+            self.queryset, self.user)
+        self.assertTrue(created)
+        self.assertEqual(Export.objects.enqueue(Export.TN_LISTE,
+            self.queryset, self.user), (export, False))
+
+    def test_abgebrochen(self):
+        export, created = Export.objects.enqueue(Export.TN_LISTE,
+            self.queryset, self.user)
+        Export.objects.filter(pk=export.pk).update(status=Export.LAEUFT,
+            gestartet=now() - Export.TIMEOUT - timedelta(minutes=1))
+
+        neu, created = Export.objects.enqueue(Export.TN_LISTE,
+            self.queryset, self.user)
+        self.assertTrue(created)
+
+        call_command('exporte_erstellen')
+        self.assertEqual(Export.objects.get(pk=export.pk).status,
+            Export.FEHLER)
+        self.assertEqual(Export.objects.get(pk=neu.pk).status, Export.FERTIG)
+
+    def test_pdf(self):
+        erste = Anmeldung.objects.get()
+        anmeldung_erstellen(erste.kurs, user_erstellen('tn2'),
+            abteilung=erste.abteilung)
+        export, created = Export.objects.enqueue(Export.ANMELDUNGEN_PDF,
+            self.queryset, self.user)
+        call_command('exporte_erstellen')
+
+        export = Export.objects.get(pk=export.pk)
+        self.assertEqual(export.status, Export.FERTIG, export.fehler)
+        self.assertTrue(export.datei.name.endswith('.pdf'))
+        pdf = PdfFileReader(StringIO(export.datei.read()))
+        self.assertGreaterEqual(pdf.getNumPages(), 2)
+
+        # The pages are cached per participant
+        for anmeldung in self.queryset.select_related('kurs', 'abteilung'):
+            self.assertIsNotNone(admin_actions.cache.get(seite_key(
+                'anmeldung/seiten/anmeldung.html', anmeldung,
+                'anmeldung/pdf.html')))
+
+    def test_xlsx_formeln(self):
+        anmeldung = Anmeldung.objects.get()
+        Zusatzfeld.objects.create(kurs=anmeldung.kurs, typ='char',
+            label='Essen')
+        anmeldung.zusatz = {'essen': '=1+1'}
+        anmeldung.nachname = '@SUM(A1)'
+        anmeldung.save()
+
+        datei = StringIO()
+        tn_xlsx(self.queryset, datei)
+        xlsx = ZipFile(StringIO(datei.getvalue()))
+        self.assertNotIn('<f>', xlsx.read('xl/worksheets/sheet1.xml'))
+        strings = xlsx.read('xl/sharedStrings.xml')
+        self.assertIn("'=1+1", strings)
+        self.assertIn("'@SUM(A1)", strings)
+
+    def test_download_berechtigung(self):
+        export, created = Export.objects.enqueue(Export.TN_LISTE,
+            self.queryset, self.user)
+        call_command('exporte_erstellen')
+        url = reverse('admin:anmeldung_export_download', args=(export.pk,))
+
+        staff = user_erstellen('staff', is_staff=True)
+        self.assertTrue(einloggen(self.client, staff))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+        staff.user_permissions.add(
+            Permission.objects.get(codename='change_export'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Disposition'].startswith(
+            'attachment'))
+
+
+class AbteilungAdminFormTest(TestCase):
+    def test_doppelt(self):
+        abteilung_erstellen(name='Glockenhof')
+        andere = abteilung_erstellen(name='Hadlaub')
+
+        form = AbteilungAdminForm({'verband': 'ZH', 'region': u'Zürich',
+            'name': ' glockenhof'}, instance=andere)
+        self.assertFalse(form.is_valid())
+        self.assertIn('abteilungen_zusammenfuehren',
+            form.non_field_errors()[0])
+
+    def test_umbenennen(self):
+        abteilung = abteilung_erstellen(name='Glockenhof')
+        form = AbteilungAdminForm({'verband': 'ZH', 'region': u'Zürich',
+            'name': 'Glockenhof Zürich'}, instance=abteilung)
+        self.assertTrue(form.is_valid(), form.errors)
+        form.save()
+
+
+class KursplaetzeTest(TestCase):
+    def test_kurs_wechseln(self):
+        alt = kurs_erstellen(url='alt')
+        neu = kurs_erstellen(url='neu')
+        anmeldung = anmeldung_erstellen(alt, user_erstellen('tn'))
+        self.assertEqual(Kurs.objects.get(pk=alt.pk).belegte_plaetze, 1)
+
+        anmeldung.kurs = neu
+        anmeldung.save()
+        self.assertEqual(Kurs.objects.get(pk=alt.pk).belegte_plaetze, 0)
+        self.assertEqual(Kurs.objects.get(pk=neu.pk).belegte_plaetze, 1)
+
+        # Saving again doesn't count twice
+        anmeldung.save()
+        self.assertEqual(Kurs.objects.get(pk=neu.pk).belegte_plaetze, 1)
+
+    def test_platz_reservieren(self):
+        kurs = kurs_erstellen(kursplaetze=2)
+        self.assertEqual([Kurs.objects.platz_reservieren(kurs.pk)
+            for i in range(3)], [True, True, False])
+        self.assertEqual(Kurs.objects.get(pk=kurs.pk).belegte_plaetze, 2)
+
+        unbeschraenkt = kurs_erstellen(url='unbeschraenkt')
+        self.assertTrue(Kurs.objects.platz_reservieren(unbeschraenkt.pk))
+
+    def test_kursplaetze_erhoeht(self):
+        kurs = kurs_erstellen(kursplaetze=2)
+        anmeldung_erstellen(kurs, user_erstellen('tn'))
+        eintrag = Warteliste.objects.create(kurs=kurs,
+            user=user_erstellen('wartend'), position=1)
+
+        # Other changes of the course leave the waiting list alone
+        kurs = Kurs.objects.get(pk=kurs.pk)
+        kurs.name = 'Aufbaukurs'
+        kurs.save()
+        self.assertIsNone(Warteliste.objects.get(pk=eintrag.pk).nachgerueckt)
+
+        kurs.kursplaetze = 3
+        kurs.save()
+        self.assertIsNotNone(
+            Warteliste.objects.get(pk=eintrag.pk).nachgerueckt)
+
+
+class ZahlungenTest(TestCase):
+    def setUp(self):
+        kurs = kurs_erstellen()
+        self.anmeldung = anmeldung_erstellen(kurs, user_erstellen('tn'))
+        self.user = user_erstellen('admin')
+
+    def zahlung(self, mitteilung):
+        return Zahlung(2, date(2030, 1, 15), Decimal(150), mitteilung)
+
+    def test_referenz(self):
+        self.assertEqual(self.zahlung(u'Lagerbeitrag A-00042 Pfiff')
+            .referenz, 42)
+        for mitteilung in (u'Einzahlung Tarif A1 Meier', u'Kurs a3 2030',
+                u'a-00042', u'A-42'):
+            self.assertIsNone(self.zahlung(mitteilung).referenz, mitteilung)
+
+    def test_abgleichen(self):
+        pk = self.anmeldung.pk
+        andere = self.zahlung(u'Tarif A%d Meier' % pk)
+        richtig = self.zahlung(self.anmeldung.zahlungsreferenz)
+        ergebnis = abgleichen([andere, richtig], self.user)
+
+        self.assertEqual(ergebnis.nicht_zugeordnet, [andere])
+        self.assertEqual(ergebnis.bezahlt, [richtig])
+        self.assertEqual(Anmeldung.objects.get(pk=pk).bezahlt,
+            date(2030, 1, 15))
+
+
+@override_settings(SESSION_ENGINE=SESSIONS)
+class AnzahlQueriesTest(TestCase):
+    """Pages listing participants must not need a query per row"""
+
+    def setUp(self):
+        self.kurse = [kurs_erstellen(url='kurs%d' % i) for i in range(3)]
+        self.abteilung = abteilung_erstellen()
+
+        self.admin = user_erstellen('admin', is_staff=True,
+            is_superuser=True)
+        Abteilungsleitung.objects.create(abteilung=self.abteilung,
+            user=self.admin)
+        self.assertTrue(einloggen(self.client, self.admin))
+
+    def anmeldungen(self, anzahl):
+        Anmeldung.objects.all().delete()
+        User.objects.exclude(pk=self.admin.pk).delete()
+        anmeldungen_erstellen(self.kurse, self.abteilung, anzahl)
+
+    def test_al_bereich(self):
+        url = reverse('al_bereich', kwargs={'abteilung': self.abteilung.slug})
+        for anzahl in (5, 500):
+            self.anmeldungen(anzahl)
+            with self.assertNumQueries(4):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_admin_changelist(self):
+        url = reverse('admin:anmeldung_anmeldung_changelist')
+        nothelfer = Zusatzfeld.objects.create(kurs=self.kurse[0],
+            typ='checkbox', label='Nothelfer')
+        for anzahl in (3, 40):
+            self.anmeldungen(anzahl)
+            Zusatzantwort.objects.bulk_create([Zusatzantwort(
+                anmeldung=anmeldung, zusatzfeld=nothelfer, ja=True)
+                for anmeldung in self.kurse[0].anmeldungen.all()])
+            with self.assertNumQueries(7):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class SeitenTest(TestCase):
+    def setUp(self):
+        self.kurs = kurs_erstellen()
+        self.abteilung = abteilung_erstellen()
+        self.anmeldung = anmeldung_erstellen(self.kurs, user_erstellen('tn'),
+            abteilung=self.abteilung)
+
+    def key(self):
+        anmeldung = Anmeldung.objects.select_related('kurs', 'abteilung') \
+            .get(pk=self.anmeldung.pk)
+        return seite_key('anmeldung/seiten/anmeldung.html', anmeldung)
+
+    def test_kurs_umbenannt(self):
+        alt = self.key()
+        kurs = Kurs.objects.get(pk=self.kurs.pk)
+        kurs.name = 'Aufbaukurs'
+        kurs.save()
+        self.assertNotEqual(self.key(), alt)
+
+    def test_abteilungen_zusammengefuehrt(self):
+        alt = self.key()
+        ziel = abteilung_erstellen(name='Hadlaub')
+        Abteilung.objects.zusammenfuehren(ziel, [self.abteilung])
+        self.assertNotEqual(self.key(), alt)
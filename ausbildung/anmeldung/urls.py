@@ -9,6 +9,8 @@ urlpatterns = patterns('ausbildung.anmeldung.views',
 
     url(r'^kurs/(?P<kurs>[-\w]+)/anmelden/$', 'anmeldung_form',
         name='anmeldung_form'),
+    url(r'^kurs/(?P<kurs>[-\w]+)/warteliste/$', 'warteliste',
+        name='warteliste'),
     url(r'^kurs/(?P<kurs>[-\w]+)/anmeldung/$', 'anmeldung_view',
         name='anmeldung_view'),
     url(r'^kurs/(?P<kurs>[-\w]+)/anmeldung/edit/$', 'anmeldung_edit',
@@ -1,9 +1,9 @@
 # encoding: utf-8
 from datetime import timedelta
+from functools import wraps
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.mail import send_mail
 from django.core.exceptions import ObjectDoesNotExist
 from django.http import HttpResponseForbidden
 from django.forms.models import model_to_dict
@@ -12,37 +12,100 @@ from django.template.loader import render_to_string
 from django.utils.datastructures import SortedDict
 from django.utils.timezone import now
 
-from .models import Abteilung, Kurs, Anmeldung, Notfallblatt, ALFeedback
+from ausbildung.outbox.utils import send_mail
+from ausbildung.pagecache import cache_page_with_holes, hole
+
+from .models import (Abteilung, Kurs, Anmeldung, Notfallblatt, ALFeedback,
+    Warteliste)
 
 from .forms import (AbteilungForm, AnmeldungForm, NotfallblattForm,
     ALFeedbackForm)
 
 
 def requires_anmeldung(view):
+    @wraps(view)
     def wrap(request, kurs, *args, **kwargs):
+        # The participant pages all show the course and most of them the
+        # Notfallblatt and the AL feedback, they come with the Anmeldung
         try:
-            anmeldung = request.user.anmeldungen.get(kurs__url=kurs)
-        except:
+            anmeldung = Anmeldung.objects.select_related('kurs', 'abteilung',
+                'notfallblatt', 'alfeedback').get(user=request.user,
+                kurs__url=kurs)
+        except Anmeldung.DoesNotExist:
             return redirect('anmeldung_form', kurs=kurs)
         return view(request, anmeldung, *args, **kwargs)
     return wrap
 
 
+def ausgebucht(request, kurs):
+    """
+    Returns the fully booked page for a full course, or ``None`` if the user
+    may register anyway because the waiting list reserved a seat for him.
+    """
+    if not kurs.ausgebucht:
+        return None
+
+    try:
+        eintrag = kurs.warteliste.get(user=request.user)
+    except Warteliste.DoesNotExist:
+        eintrag = None
+
+    if eintrag and eintrag.nachgerueckt:
+        return None
+
+    return render(request, 'anmeldung/fully_booked.html', {
+        'kurs': kurs,
+        'eintrag': eintrag,
+    })
+
+
 def index(request):
     return redirect('kurse_list')
 
 
-def kurse_list(request):
-    kurse = Kurs.objects.online()
+def angemeldete_kurse(request):
+    if not hasattr(request, '_angemeldete_kurse'):
+        if request.user.is_authenticated():
+            request._angemeldete_kurse = set(
+                request.user.anmeldungen.values_list('kurs_id', flat=True))
+        else:
+            request._angemeldete_kurse = set()
+    return request._angemeldete_kurse
+
+
+@hole('angemeldet')
+def angemeldet_hole(request, kurs_id):
+    if int(kurs_id) in angemeldete_kurse(request):
+        return u'angemeldet'
+    return u''
+
+
+@hole('angemeldet_hinweis')
+def angemeldet_hinweis_hole(request, kurs_id):
+    if int(kurs_id) in angemeldete_kurse(request):
+        return render_to_string('holes/angemeldet.html')
+    return u''
 
-    if request.user.is_authenticated():
-        angemeldete_kurse = request.user.angemeldete_kurse.all()
-    else:
-        angemeldete_kurse = ()
 
+@hole('freie_plaetze')
+def freie_plaetze_hole(request, kurs_id):
+    # The counter changes with every Anmeldung, it is not part of the page
+    if not hasattr(request, '_kurse'):
+        request._kurse = dict((kurs.pk, kurs) for kurs in
+            Kurs.objects.online().only('kursplaetze', 'belegte_plaetze'))
+    kurs = request._kurse.get(int(kurs_id))
+    return unicode(kurs.freie_plaetze) if kurs else u''
+
+
+@hole('al_links')
+def al_links_hole(request):
+    return render_to_string('holes/al_links.html', {'request': request})
+
+
+@cache_page_with_holes
+def kurse_list(request):
     return render(request, 'kurse/list.html', {
-        'kurse': kurse,
-        'angemeldete_kurse': angemeldete_kurse,
+        'kurse': Kurs.objects.online(),
     })
 
 
@@ -53,13 +116,12 @@ def anmeldung_form(request, kurs):
     if now().date() - timedelta(days=60) > kurs.anmeldeschluss:
         return render(request, 'anmeldung/too_late.html')
 
-    if request.user in kurs.teilnehmer.all():
+    if kurs.anmeldungen.filter(user=request.user).exists():
         return redirect('anmeldung_view', kurs=kurs.url)
 
-    if kurs.kursplaetze and kurs.freie_plaetze <= 0:
-        return render(request, 'anmeldung/fully_booked.html', {
-            'kurs': kurs
-        })
+    response = ausgebucht(request, kurs)
+    if response:
+        return response
 
     initial = {'email': request.user.email}
 
@@ -90,9 +152,31 @@ def anmeldung_form(request, kurs):
 
             zusatzform = Zusatzform(request.POST, prefix='zusatz')
             if zusatzform.is_valid():
+                # Lock the course row until the request transaction is
+                # committed, concurrent registrations queue up here instead
+                # of all passing the capacity check at the same time.
+                kurs = Kurs.objects.select_for_update().get(pk=kurs.pk)
+
+                if kurs.anmeldungen.filter(user=request.user).exists():
+                    return redirect('anmeldung_view', kurs=kurs.url)
+
+                if Kurs.objects.platz_reservieren(kurs.pk):
+                    anmeldung._platz_reserviert = True
+                else:
+                    # Fully booked, unless the waiting list reserved a
+                    # seat for the user
+                    response = ausgebucht(request,
+                        Kurs.objects.get(pk=kurs.pk))
+                    if response:
+                        return response
+
                 anmeldung.zusatz = zusatzform.clean()
                 anmeldung.save()
 
+                # Frees the seat reserved by the waiting list, it is now
+                # taken by the new Anmeldung
+                kurs.warteliste.filter(user=request.user).delete()
+
                 subject = u'Anmeldung von %(name)s an %(kurs)s' % \
                     {'name': anmeldung.pfadiname, 'kurs': anmeldung.kurs}
                 message = render_to_string('anmeldung/email.txt',
@@ -114,6 +198,20 @@ def anmeldung_form(request, kurs):
     })
 
 
+@login_required
+def warteliste(request, kurs):
+    if request.method != 'POST':
+        return redirect('anmeldung_form', kurs=kurs)
+
+    kurs = get_object_or_404(Kurs.objects.select_for_update(), url=kurs)
+
+    if kurs.ausgebucht and \
+            not kurs.anmeldungen.filter(user=request.user).exists():
+        Warteliste.objects.eintragen(kurs, request.user)
+
+    return redirect('anmeldung_form', kurs=kurs.url)
+
+
 @login_required
 @requires_anmeldung
 def anmeldung_edit(request, anmeldung):
@@ -215,11 +313,16 @@ def notfallblatt_edit(request, anmeldung):
 def al_bereich(request, abteilung):
     abteilung = get_object_or_404(Abteilung, slug=abteilung)
 
-    if abteilung not in request.user.abteilungen.all():
+    if not request.user.abteilungen.filter(pk=abteilung.pk).exists():
         return HttpResponseForbidden('Du bist nicht AL dieser Abteilung')
 
+    tns = Anmeldung.objects.filter(abteilung=abteilung) \
+        .select_related('kurs', 'alfeedback') \
+        .order_by('kurs__order', 'kurs__id', 'id')
+
+    # Ordered by course, so grouping is a single pass
     anmeldungen = SortedDict()
-    for anmeldung in Anmeldung.objects.filter(abteilung=abteilung):
+    for anmeldung in tns:
         abteilung_tns = anmeldungen.setdefault(anmeldung.kurs, [])
         abteilung_tns.append(anmeldung)
 
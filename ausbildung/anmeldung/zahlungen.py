@@ -0,0 +1,123 @@
+# encoding: utf-8
+"""
+Reconciliation of the payments exported from the PostFinance e-banking.
+
+The export is a csv file separated by semicolons with the columns
+``Datum``, ``Betrag`` and ``Mitteilung``. The Zahlungsreferenz shown on the
+Anmeldung page (e.g. ``A-00042``) identifies the Anmeldung in the
+Mitteilung. All Anmeldungen of a file are loaded with one query and the
+matching ones are marked as paid with one UPDATE per date.
+"""
+
+import re
+import unicodecsv
+
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from .admin_actions import daten_setzen
+from .models import Anmeldung
+
+
+# Exactly as printed by Anmeldung.zahlungsreferenz, looser patterns match
+# ordinary text like "Tarif A1"
+REFERENZ = re.compile(r'\bA-(\d{5,})\b')
+
+
+class Zahlung(object):
+    def __init__(self, zeile, datum, betrag, mitteilung):
+        self.zeile = zeile
+        self.datum = datum
+        self.betrag = betrag
+        self.mitteilung = mitteilung
+        self.anmeldung = None
+        self.fehler = None
+
+    @property
+    def referenz(self):
+        match = REFERENZ.search(self.mitteilung)
+        return int(match.group(1)) if match else None
+
+
+class Ergebnis(object):
+    def __init__(self):
+        self.bezahlt = []
+        self.bereits_bezahlt = []
+        self.betrag_falsch = []
+        self.nicht_zugeordnet = []
+
+
+def datum_lesen(wert):
+    for format in ('%d.%m.%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(wert.strip(), format).date()
+        except ValueError:
+            pass
+    raise ValueError(u'Ungültiges Datum: %s' % wert)
+
+
+def betrag_lesen(wert):
+    wert = wert.strip().replace("'", '').replace(' ', '')
+    if ',' in wert and '.' not in wert:
+        wert = wert.replace(',', '.')
+    try:
+        return Decimal(wert)
+    except InvalidOperation:
+        raise ValueError(u'Ungültiger Betrag: %s' % wert)
+
+
+def zahlungen_lesen(datei):
+    """Returns the rows of the uploaded csv ``datei`` as ``Zahlung`` objects"""
+    inhalt = datei.read()
+    try:
+        inhalt.decode('utf-8')
+        encoding = 'utf-8-sig'
+    except UnicodeDecodeError:
+        # Older exports are in latin-1
+        encoding = 'latin-1'
+
+    reader = unicodecsv.DictReader(inhalt.splitlines(), delimiter=';',
+        encoding=encoding)
+
+    zahlungen = []
+    for zeile, row in enumerate(reader, 2):
+        row = dict((key.strip().lower(), value or u'')
+            for key, value in row.items() if key)
+        zahlung = Zahlung(zeile, None, None, row.get('mitteilung', u''))
+        try:
+            zahlung.datum = datum_lesen(row.get('datum', u''))
+            zahlung.betrag = betrag_lesen(row.get('betrag', u''))
+        except ValueError as e:
+            zahlung.fehler = unicode(e)
+        zahlungen.append(zahlung)
+    return zahlungen
+
+
+def abgleichen(zahlungen, user):
+    """
+    Assigns ``zahlungen`` to their Anmeldungen and sets ``bezahlt`` of the
+    ones paid with the correct amount. Returns an ``Ergebnis``.
+    """
+    ergebnis = Ergebnis()
+
+    referenzen = set(z.referenz for z in zahlungen
+        if not z.fehler and z.referenz)
+    anmeldungen = Anmeldung.objects.select_related('kurs') \
+        .in_bulk(list(referenzen))
+
+    daten = {}
+    for zahlung in zahlungen:
+        zahlung.anmeldung = anmeldungen.get(zahlung.referenz)
+
+        if zahlung.fehler or zahlung.anmeldung is None:
+            ergebnis.nicht_zugeordnet.append(zahlung)
+        elif zahlung.anmeldung.bezahlt or zahlung.anmeldung.pk in daten:
+            ergebnis.bereits_bezahlt.append(zahlung)
+        elif zahlung.betrag != zahlung.anmeldung.kurs.lagerbeitrag:
+            ergebnis.betrag_falsch.append(zahlung)
+        else:
+            daten[zahlung.anmeldung.pk] = zahlung.datum
+            ergebnis.bezahlt.append(zahlung)
+
+    daten_setzen('bezahlt', daten, user, u'Zahlungen abgeglichen')
+    return ergebnis
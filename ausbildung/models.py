@@ -1,5 +1,8 @@
 # encoding: utf-8
 
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
 
 from feincms.module.page.models import Page
@@ -12,6 +15,8 @@ from feincms_cleanse import cleanse_html
 
 from BeautifulSoup import BeautifulSoup
 
+from ausbildung import pagecache
+
 Page.register_extensions()
 
 Page.register_templates({
@@ -31,6 +36,18 @@ Page.register_templates({
 
 Page.register_extensions('feincms.module.page.extensions.titles')
 
+# The h3 entries of the sectionmenu, computed when a section is saved
+SECTIONMENU_KEY = 'sectionmenu.%d'
+SECTIONMENU_TIMEOUT = 60 * 60 * 24 * 30
+
+
+def sectionmenu_entries(section, soup):
+    return [{
+        'title': unicode(h3.text),
+        'anchor': u'#section%d.%d' % (section.id, i + 1),
+    } for i, h3 in enumerate(soup.findAll('h3'))]
+
+
 # Patch Section content to support cleanse and save anchors on headings
 def save(self, *args, **kwargs):
     if getattr(self, 'cleanse', False):
@@ -50,6 +67,9 @@ def save(self, *args, **kwargs):
 
     super(SectionContent, self).save(*args, **kwargs)
 
+    cache.set(SECTIONMENU_KEY % self.id, sectionmenu_entries(self, soup),
+        SECTIONMENU_TIMEOUT)
+
 SectionContent.save = save
 
 Page.create_content_type(RichTextContent, cleanse=cleanse_html)
@@ -60,3 +80,14 @@ Page.create_content_type(SectionContent, cleanse=cleanse_html, TYPE_CHOICES=(
 Page.create_content_type(MediaFileContent, TYPE_CHOICES=(
     ('default', _('default')),
 ))
+
+
+# Invalidate the cached pages whenever a page or its content is changed
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def page_changed(sender, **kwargs):
+    pagecache.invalidate()
+
+for content_type in Page._feincms_content_types:
+    post_save.connect(page_changed, sender=content_type)
+    post_delete.connect(page_changed, sender=content_type)
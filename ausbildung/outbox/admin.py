@@ -0,0 +1,23 @@
+# encoding: utf-8
+
+from django.contrib import admin
+from django.utils.timezone import now
+
+from .models import Mail
+
+
+def retry(modeladmin, request, queryset):
+    queryset.filter(sent__isnull=True).update(failed=False, attempts=0,
+        next_attempt=now())
+retry.short_description = 'Erneut versenden'
+
+
+class MailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'created', 'sent', 'attempts', 'failed')
+    list_filter = ('failed', 'sent')
+    search_fields = ('subject', 'to')
+    readonly_fields = ('created', 'sent', 'attempts', 'last_error')
+    actions = [retry]
+
+
+admin.site.register(Mail, MailAdmin)
@@ -0,0 +1,67 @@
+# encoding: utf-8
+
+import time
+
+from optparse import make_option
+
+from django.core.mail import get_connection
+from django.core.management.base import NoArgsCommand
+
+from ausbildung.outbox.models import Mail
+
+
+class Command(NoArgsCommand):
+    help = (u'Versendet die Mails aus dem Postausgang in Batches über eine '
+            u'einzige SMTP-Verbindung. Per cron oder mit --loop als '
+            u'Worker ausführen.')
+
+    option_list = NoArgsCommand.option_list + (
+        make_option('--batch-size', type='int', dest='batch_size', default=50,
+            help='Anzahl Mails pro SMTP-Verbindung'),
+        make_option('--loop', action='store_true', dest='loop', default=False,
+            help='Nicht beenden, sondern auf neue Mails warten'),
+        make_option('--interval', type='int', dest='interval', default=10,
+            help='Wartezeit in Sekunden im --loop Modus'),
+    )
+
+    def handle_noargs(self, **options):
+        while True:
+            while self.send_batch(options['batch_size']):
+                pass
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def send_batch(self, batch_size):
+        mails = Mail.objects.claim(batch_size)
+        if not mails:
+            return 0
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as e:
+            # SMTP server not reachable, retry the whole batch next time
+            self.stderr.write(u'SMTP: %s' % e)
+            Mail.objects.release(mails)
+            return 0
+
+        try:
+            for i, mail in enumerate(mails):
+                if mail.send(connection):
+                    continue
+
+                self.stderr.write(u'%s: %s' % (mail, mail.last_error))
+                # The connection may be broken after an error
+                connection.close()
+                try:
+                    connection.open()
+                except Exception as e:
+                    self.stderr.write(u'SMTP: %s' % e)
+                    Mail.objects.release(mails[i + 1:])
+                    return 0
+        finally:
+            connection.close()
+
+        return len(mails)
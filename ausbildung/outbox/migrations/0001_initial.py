@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import datetime
+from south.db import db
+from south.v2 import SchemaMigration
+from django.db import models
+
+
+class Migration(SchemaMigration):
+
+    def forwards(self, orm):
+        # Adding model 'Mail'
+        db.create_table(u'outbox_mail', (
+            (u'id', self.gf('django.db.models.fields.AutoField')(primary_key=True)),
+            ('subject', self.gf('django.db.models.fields.CharField')(max_length=255)),
+            ('body', self.gf('django.db.models.fields.TextField')()),
+            ('from_email', self.gf('django.db.models.fields.CharField')(max_length=255)),
+            ('to', self.gf('ausbildung.anmeldung.fields.JSONField')()),
+            ('cc', self.gf('ausbildung.anmeldung.fields.JSONField')(null=True, blank=True)),
+            ('bcc', self.gf('ausbildung.anmeldung.fields.JSONField')(null=True, blank=True)),
+            ('headers', self.gf('ausbildung.anmeldung.fields.JSONField')(null=True, blank=True)),
+            ('alternatives', self.gf('ausbildung.anmeldung.fields.JSONField')(null=True, blank=True)),
+            ('created', self.gf('django.db.models.fields.DateTimeField')(auto_now_add=True, blank=True)),
+            ('next_attempt', self.gf('django.db.models.fields.DateTimeField')(default=datetime.datetime.now, db_index=True)),
+            ('attempts', self.gf('django.db.models.fields.PositiveSmallIntegerField')(default=0)),
+            ('sent', self.gf('django.db.models.fields.DateTimeField')(null=True, blank=True)),
+            ('failed', self.gf('django.db.models.fields.BooleanField')(default=False)),
+            ('last_error', self.gf('django.db.models.fields.TextField')(blank=True)),
+        ))
+        db.send_create_signal(u'outbox', ['Mail'])
+
+
+    def backwards(self, orm):
+        # Deleting model 'Mail'
+        db.delete_table(u'outbox_mail')
+
+
+    models = {
+        u'outbox.mail': {
+            'Meta': {'ordering': "('-created',)", 'object_name': 'Mail'},
+            'alternatives': ('ausbildung.anmeldung.fields.JSONField', [], {'null': 'True', 'blank': 'True'}),
+            'attempts': ('django.db.models.fields.PositiveSmallIntegerField', [], {'default': '0'}),
+            'bcc': ('ausbildung.anmeldung.fields.JSONField', [], {'null': 'True', 'blank': 'True'}),
+            'body': ('django.db.models.fields.TextField', [], {}),
+            'cc': ('ausbildung.anmeldung.fields.JSONField', [], {'null': 'True', 'blank': 'True'}),
+            'created': ('django.db.models.fields.DateTimeField', [], {'auto_now_add': 'True', 'blank': 'True'}),
+            'failed': ('django.db.models.fields.BooleanField', [], {'default': 'False'}),
+            'from_email': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'headers': ('ausbildung.anmeldung.fields.JSONField', [], {'null': 'True', 'blank': 'True'}),
+            u'id': ('django.db.models.fields.AutoField', [], {'primary_key': 'True'}),
+            'last_error': ('django.db.models.fields.TextField', [], {'blank': 'True'}),
+            'next_attempt': ('django.db.models.fields.DateTimeField', [], {'default': 'datetime.datetime.now', 'db_index': 'True'}),
+            'sent': ('django.db.models.fields.DateTimeField', [], {'null': 'True', 'blank': 'True'}),
+            'subject': ('django.db.models.fields.CharField', [], {'max_length': '255'}),
+            'to': ('ausbildung.anmeldung.fields.JSONField', [], {})
+        }
+    }
+
+    complete_apps = ['outbox']
\ No newline at end of file
@@ -0,0 +1,127 @@
+# encoding: utf-8
+
+from datetime import timedelta
+
+from django.core.mail import EmailMultiAlternatives
+from django.db import models
+from django.utils.timezone import now
+
+from ausbildung.anmeldung.fields import JSONField
+
+
+class MailManager(models.Manager):
+    def enqueue(self, message):
+        """
+        Stores an ``EmailMessage`` (or ``EmailMultiAlternatives``) instance
+        in the outbox. It is sent by ``manage.py send_outbox`` once the
+        current transaction has been committed.
+        """
+        return self.create(
+            subject=message.subject,
+            body=message.body,
+            from_email=message.from_email,
+            to=list(message.to),
+            cc=list(message.cc),
+            bcc=list(message.bcc),
+            headers=message.extra_headers,
+            alternatives=list(getattr(message, 'alternatives', [])),
+        )
+
+    def due(self):
+        return self.filter(sent__isnull=True, failed=False,
+            next_attempt__lte=now())
+
+    def claim(self, batch_size):
+        """
+        Returns up to ``batch_size`` due mails, reserved for the calling
+        worker by moving their next attempt behind the lease. Mails another
+        worker claimed in the meantime are skipped, mails of a worker that
+        died become due again once the lease has expired.
+        """
+        claimed = []
+        for mail in self.due().order_by('next_attempt')[:batch_size]:
+            lease = now() + Mail.LEASE
+            if self.filter(pk=mail.pk, next_attempt=mail.next_attempt,
+                    sent__isnull=True).update(next_attempt=lease):
+                mail.next_attempt = lease
+                claimed.append(mail)
+        return claimed
+
+    def release(self, mails):
+        """Makes claimed but unsent ``mails`` due again"""
+        self.filter(pk__in=[mail.pk for mail in mails],
+            sent__isnull=True).update(next_attempt=now())
+
+
+class Mail(models.Model):
+
+    # Give up after this many failed attempts, the delay between two
+    # attempts doubles every time, starting with BACKOFF.
+    MAX_ATTEMPTS = 8
+    BACKOFF = timedelta(minutes=1)
+
+    # Time a worker has to send a claimed mail
+    LEASE = timedelta(minutes=10)
+
+    subject = models.CharField('Betreff', max_length=255)
+    body = models.TextField('Text')
+    from_email = models.CharField('Absender', max_length=255)
+    to = JSONField(u'Empfänger')
+    cc = JSONField('Cc', blank=True, null=True)
+    bcc = JSONField('Bcc', blank=True, null=True)
+    headers = JSONField('Header', blank=True, null=True)
+    alternatives = JSONField('Alternativen', blank=True, null=True)
+
+    created = models.DateTimeField('Erstellt', auto_now_add=True)
+    next_attempt = models.DateTimeField(u'Nächster Versuch', default=now,
+        db_index=True)
+    attempts = models.PositiveSmallIntegerField('Versuche', default=0)
+    sent = models.DateTimeField('Versendet', blank=True, null=True)
+    failed = models.BooleanField('Fehlgeschlagen', default=False)
+    last_error = models.TextField('Letzter Fehler', blank=True)
+
+    objects = MailManager()
+
+    class Meta:
+        verbose_name = 'Mail'
+        verbose_name_plural = 'Mails'
+        ordering = ('-created',)
+
+    def __unicode__(self):
+        return self.subject
+
+    def message(self, connection=None):
+        return EmailMultiAlternatives(
+            subject=self.subject,
+            body=self.body,
+            from_email=self.from_email,
+            to=self.to,
+            cc=self.cc,
+            bcc=self.bcc,
+            headers=self.headers,
+            alternatives=[tuple(a) for a in self.alternatives or ()],
+            connection=connection,
+        )
+
+    def send(self, connection=None):
+        """
+        Sends the mail and records the outcome. Returns ``True`` if the mail
+        has been sent, otherwise the next attempt is scheduled.
+        """
+        self.attempts += 1
+        try:
+            self.message(connection).send()
+        except Exception as e:
+            self.last_error = unicode(e)
+            if self.attempts >= self.MAX_ATTEMPTS:
+                self.failed = True
+            else:
+                self.next_attempt = now() + \
+                    self.BACKOFF * 2 ** (self.attempts - 1)
+            self.save()
+            return False
+
+        self.sent = now()
+        self.last_error = ''
+        self.save()
+        return True
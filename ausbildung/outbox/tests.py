@@ -0,0 +1,97 @@
+from datetime import timedelta
+from StringIO import StringIO
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from .models import Mail
+from .utils import send_mail
+
+
+class FehlerBackend(BaseEmailBackend):
+    """SMTP server rejecting every mail, the connection can't be reopened"""
+    opened = 0
+
+    def open(self):
+        FehlerBackend.opened += 1
+        if FehlerBackend.opened > 1:
+            raise IOError('Verbindung verloren')
+
+    def send_messages(self, messages):
+        raise IOError('Abgelehnt')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class OutboxTest(TestCase):
+    def setUp(self):
+        FehlerBackend.opened = 0
+        self.mail = send_mail('Betreff', 'Text', 'von@example.ch',
+            ['an@example.ch'])
+
+    def versenden(self):
+        call_command('send_outbox', stderr=StringIO())
+
+    def test_versenden(self):
+        self.versenden()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Betreff')
+        self.assertIsNotNone(Mail.objects.get(pk=self.mail.pk).sent)
+
+        # Nothing is sent twice
+        self.versenden()
+        self.assertEqual(len(mail.outbox), 1)
+
+    @override_settings(EMAIL_BACKEND='ausbildung.outbox.tests.FehlerBackend')
+    def test_backoff(self):
+        self.versenden()
+        fehler = Mail.objects.get(pk=self.mail.pk)
+        self.assertEqual(fehler.attempts, 1)
+        self.assertEqual(fehler.last_error, 'Abgelehnt')
+        self.assertIsNone(fehler.sent)
+        self.assertAlmostEqual(fehler.next_attempt, now() + Mail.BACKOFF,
+            delta=timedelta(seconds=5))
+
+        # Not due yet
+        self.versenden()
+        self.assertEqual(Mail.objects.get(pk=self.mail.pk).attempts, 1)
+
+        Mail.objects.update(next_attempt=now())
+        FehlerBackend.opened = 0
+        self.versenden()
+        fehler = Mail.objects.get(pk=self.mail.pk)
+        self.assertEqual(fehler.attempts, 2)
+        self.assertAlmostEqual(fehler.next_attempt, now() + 2 * Mail.BACKOFF,
+            delta=timedelta(seconds=5))
+
+    @override_settings(EMAIL_BACKEND='ausbildung.outbox.tests.FehlerBackend')
+    def test_max_attempts(self):
+        Mail.objects.update(attempts=Mail.MAX_ATTEMPTS - 1)
+        self.versenden()
+        fehler = Mail.objects.get(pk=self.mail.pk)
+        self.assertTrue(fehler.failed)
+        self.assertFalse(Mail.objects.due().exists())
+
+    @override_settings(EMAIL_BACKEND='ausbildung.outbox.tests.FehlerBackend')
+    def test_verbindung_verloren(self):
+        zweites = send_mail('Zweites', 'Text', 'von@example.ch',
+            ['an@example.ch'])
+
+        # The reconnect after the first error fails, the worker goes on
+        # and the second mail is due again
+        self.versenden()
+        self.assertEqual(Mail.objects.get(pk=self.mail.pk).attempts, 1)
+        self.assertEqual(Mail.objects.get(pk=zweites.pk).attempts, 0)
+        self.assertTrue(Mail.objects.due().filter(pk=zweites.pk).exists())
+
+    def test_claim(self):
+        self.assertEqual(Mail.objects.claim(10), [self.mail])
+        self.assertEqual(Mail.objects.claim(10), [])
+
+        # Claimed by a worker which died
+        Mail.objects.update(next_attempt=now() - timedelta(seconds=1))
+        self.assertEqual(Mail.objects.claim(10), [self.mail])
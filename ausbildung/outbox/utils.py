@@ -0,0 +1,12 @@
+from django.core.mail import EmailMessage
+
+from .models import Mail
+
+
+def send_mail(subject, message, from_email, recipient_list):
+    """
+    Same as ``django.core.mail.send_mail``, but puts the mail into the
+    outbox instead of talking to the SMTP server during the request.
+    """
+    return Mail.objects.enqueue(
+        EmailMessage(subject, message, from_email, recipient_list))
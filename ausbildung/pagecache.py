@@ -0,0 +1,117 @@
+# encoding: utf-8
+"""
+Page cache shared by all visitors, with holes for the per-user parts.
+
+Views decorated with ``cache_page_with_holes`` are rendered once and stored
+with a marker in place of every ``{% hole %}`` tag. Each request then only
+fills the holes, e.g. the login state in the footer or the messages. The
+cached pages are keyed on a generation which is bumped whenever a page,
+its content or a course is changed (see the receivers in the models).
+"""
+
+import hashlib
+import re
+import time
+
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+
+
+GENERATION_KEY = 'pagecache.generation'
+GENERATION_TIMEOUT = 60 * 60 * 24 * 30
+PAGE_TIMEOUT = 60 * 60
+
+HOLE = re.compile(r'<!--hole ([\w ]+)-->')
+
+# name -> function(request, *args) returning the content of the hole
+holes = {}
+
+
+def hole(name):
+    def register(func):
+        holes[name] = func
+        return func
+    return register
+
+
+def fill(request, name, *args):
+    return holes[name](request, *args)
+
+
+def fill_holes(request, content):
+    def replace(match):
+        args = match.group(1).split()
+        return fill(request, *args).encode('utf-8')
+    return HOLE.sub(replace, content)
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        # A new value instead of a counter, an evicted generation must not
+        # bring back pages cached under an earlier one
+        cache.add(GENERATION_KEY, repr(time.time()), GENERATION_TIMEOUT)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+def invalidate():
+    cache.set(GENERATION_KEY, repr(time.time()), GENERATION_TIMEOUT)
+
+
+def cache_key(request):
+    path = hashlib.md5(request.get_full_path()).hexdigest()
+    return 'pagecache.%s.%s' % (generation(), path)
+
+
+def cache_page_with_holes(view):
+    @wraps(view)
+    def wrap(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        key = cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(fill_holes(request, content),
+                content_type=content_type)
+
+        # Tells the hole tags to render markers instead of their content
+        request.pagecache = True
+        try:
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and not response.is_rendered:
+                response.render()
+        finally:
+            request.pagecache = False
+
+        if response.streaming or response.status_code != 200:
+            return response
+
+        content = response.content
+
+        # Pages with a form (csrf token) or cookies are not the same for
+        # every visitor
+        if not request.META.get('CSRF_COOKIE_USED') and not response.cookies:
+            cache.set(key, (content, response['Content-Type']), PAGE_TIMEOUT)
+
+        response.content = fill_holes(request, content)
+        return response
+    return wrap
+
+
+@hole('login')
+def login_hole(request):
+    return render_to_string('holes/login.html', {'request': request})
+
+
+@hole('messages')
+def messages_hole(request):
+    return render_to_string('holes/messages.html', {
+        'messages': get_messages(request),
+    })
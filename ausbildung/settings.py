@@ -67,6 +67,13 @@ TEMPLATE_LOADERS = (
 #     'django.template.loaders.eggs.Loader',
 )
 
+# Keep the compiled templates in production (see wsgi.py for the warm-up),
+# the development server picks up template changes
+if not DEBUG:
+    TEMPLATE_LOADERS = (
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    )
+
 MIDDLEWARE_CLASSES = (
     'django.middleware.common.CommonMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -103,6 +110,7 @@ INSTALLED_APPS = (
     'suit',
     'django.contrib.auth',
     'django.contrib.contenttypes',
+    'django.contrib.sessions',
     'django.contrib.sites',
     'django.contrib.messages',
     'django.contrib.staticfiles',
@@ -121,6 +129,7 @@ INSTALLED_APPS = (
     'ausbildung',
     'ausbildung.account',
     'ausbildung.anmeldung',
+    'ausbildung.outbox',
 )
 
 SOUTH_MIGRATION_MODULES = {
@@ -133,6 +142,11 @@ AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend'
 )
 
+# gunicorn runs behind a reverse proxy, the login rate limit takes the
+# client address from its header (see account.backend.client_ip)
+LOGIN_IP_HEADER = 'HTTP_X_FORWARDED_FOR'
+LOGIN_TRUSTED_PROXIES = 1
+
 LOGIN_URL = '/account/'
 LOGOUT_URL = '/account/logout/'
 
@@ -155,10 +169,11 @@ SUIT_CONFIG = {
             'app': 'anmeldung',
             'label': 'Anmeldungen',
             'icon': 'icon-user',
-            'models': ('anmeldung', 'kurs', 'abteilung')
+            'models': ('anmeldung', 'kurs', 'abteilung', 'export')
         },
         {'app': 'page', 'icon': 'icon-file'},
         {'app': 'medialibrary', 'icon': 'icon-picture'},
+        {'app': 'outbox', 'icon': 'icon-envelope'},
         'sites',
         'auth',
     )
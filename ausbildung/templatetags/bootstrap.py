@@ -1,37 +1,56 @@
+from django.conf import settings
 from django.template import Context
 from django.template.loader import get_template
 from django import template
 
 register = template.Library()
 
+# Compiled bootstrapform templates, loaded once per process
+_templates = {}
+
+
+def get_bootstrap_template(name):
+    if settings.TEMPLATE_DEBUG:
+        return get_template(name)
+    if name not in _templates:
+        _templates[name] = get_template(name)
+    return _templates[name]
+
+
+def widget_type(field):
+    return field.field.widget.__class__.__name__.lower()
+
 
 @register.filter
 def bootstrap(element, args=''):
-    args = args.split(',')
-    nolabel = 'nolabel' in args
+    nolabel = 'nolabel' in args.split(',')
 
     element_type = element.__class__.__name__.lower()
 
     if element_type == 'boundfield':
-        template = get_template("bootstrapform/field.html")
-        context = Context({'field': element, 'nolabel': nolabel})
+        template = get_bootstrap_template("bootstrapform/field.html")
+        context = Context({
+            'field': element,
+            'nolabel': nolabel,
+            'is_checkbox': widget_type(element) == 'checkboxinput',
+        })
     else:
         has_management = getattr(element, 'management_form', None)
         if has_management:
-            template = get_template("bootstrapform/formset.html")
-            context = Context({'formset': element, 'nolabel': nolabel})
+            template = get_bootstrap_template("bootstrapform/formset.html")
+            context = Context({'formset': element, 'args': args})
         else:
-            template = get_template("bootstrapform/form.html")
-            context = Context({'form': element, 'nolabel': nolabel})
+            template = get_bootstrap_template("bootstrapform/form.html")
+            context = Context({'form': element, 'args': args})
 
     return template.render(context)
 
 
 @register.filter
 def is_checkbox(field):
-    return field.field.widget.__class__.__name__.lower() == "checkboxinput"
+    return widget_type(field) == "checkboxinput"
 
 
 @register.filter
 def is_radio(field):
-    return field.field.widget.__class__.__name__.lower() == "radioselect"
+    return widget_type(field) == "radioselect"
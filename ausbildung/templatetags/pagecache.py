@@ -0,0 +1,22 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ausbildung.pagecache import fill
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, *args):
+    """
+    Per-user part of a page cached with ``cache_page_with_holes``:
+
+        {% hole "freie_plaetze" kurs.id %}
+
+    Outside of a cached view the hole is filled right away.
+    """
+    request = context['request']
+    if getattr(request, 'pagecache', False):
+        return mark_safe(u'<!--hole %s-->' % u' '.join(
+            [name] + [unicode(arg) for arg in args]))
+    return mark_safe(fill(request, name, *args))
@@ -1,7 +1,11 @@
 from django import template
+from django.core.cache import cache
 
 from BeautifulSoup import BeautifulSoup
 
+from ausbildung.models import (SECTIONMENU_KEY, SECTIONMENU_TIMEOUT,
+    sectionmenu_entries)
+
 register = template.Library()
 
 
@@ -9,23 +13,25 @@ register = template.Library()
 def sectionmenu(feincms_page):
     menu = []
 
-    for section in feincms_page.sectioncontent_set.all():
+    sections = feincms_page.sectioncontent_set.all()
+    cached = cache.get_many([SECTIONMENU_KEY % s.id for s in sections])
+
+    for section in sections:
         entry = {
             'title': section.title,
             'anchor': u'#section%d' % section.id
         }
 
-        soup = BeautifulSoup(section.richtext)
-
-        subs = soup.findAll('h3')
-        if subs:
-            subentries = []
-            for i, sub in enumerate(subs):
-                subentries.append({
-                    'title': sub.text,
-                    'anchor': u'#section%d.%d' % (section.id, i+1)
-                })
+        # Sections saved before the cache was filled (or evicted) are parsed
+        # once here, afterwards SectionContent.save keeps the entry current
+        key = SECTIONMENU_KEY % section.id
+        subentries = cached.get(key)
+        if subentries is None:
+            soup = BeautifulSoup(section.richtext)
+            subentries = sectionmenu_entries(section, soup)
+            cache.set(key, subentries, SECTIONMENU_TIMEOUT)
 
+        if subentries:
             entry['sub'] = subentries
 
         menu.append(entry)
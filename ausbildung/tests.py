@@ -0,0 +1,47 @@
+from django import forms
+from django.template import Context, Template
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from .templatetags import bootstrap
+
+
+class Formular(forms.Form):
+    name = forms.CharField()
+    email = forms.EmailField()
+    tos = forms.BooleanField()
+
+
+class BootstrapTest(TestCase):
+    def setUp(self):
+        self.get_template = bootstrap.get_template
+        self.geladen = []
+
+        def get_template(name):
+            self.geladen.append(name)
+            return self.get_template(name)
+        bootstrap.get_template = get_template
+        bootstrap._templates.clear()
+
+    def tearDown(self):
+        bootstrap.get_template = self.get_template
+        bootstrap._templates.clear()
+
+    def rendern(self):
+        return Template('{% load bootstrap %}{{ form|bootstrap }}').render(
+            Context({'form': Formular()}))
+
+    @override_settings(TEMPLATE_DEBUG=False)
+    def test_einmal_laden(self):
+        html = self.rendern()
+        self.assertEqual(self.rendern(), html)
+        self.assertEqual(self.geladen,
+            ['bootstrapform/form.html', 'bootstrapform/field.html'])
+        self.assertEqual(set(bootstrap._templates), set(self.geladen))
+        self.assertEqual(html.count('class="checkfield"'), 1)
+
+    @override_settings(TEMPLATE_DEBUG=True)
+    def test_template_debug(self):
+        self.rendern()
+        self.assertEqual(len(self.geladen), 4)
+        self.assertEqual(bootstrap._templates, {})
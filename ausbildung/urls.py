@@ -2,6 +2,10 @@ from django.conf.urls import patterns, include, url
 from django.conf import settings
 from django.contrib import admin
 
+from feincms.views.cbv.views import Handler
+
+from ausbildung.pagecache import cache_page_with_holes
+
 admin.autodiscover()
 
 urlpatterns = patterns('',
@@ -18,6 +22,10 @@ if settings.DEBUG:
         {'document_root': settings.MEDIA_ROOT}),
     )
 
+# The feincms.urls patterns, with the pages cached for all visitors
+handler = cache_page_with_holes(Handler.as_view())
+
 urlpatterns += patterns('',
-    url(r'', include('feincms.urls')),
+    url(r'^$', handler, name='feincms_home'),
+    url(r'^(.*)/$', handler, name='feincms_handler'),
 )
\ No newline at end of file
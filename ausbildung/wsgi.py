@@ -20,9 +20,32 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ausbildung.settings")
 # This application object is used by any WSGI server configured to use this
 # file. This includes Django's development server, if the WSGI_APPLICATION
 # setting points here.
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()
 
+
+def warm_up_templates():
+    """
+    Compiles the project templates into the cached template loader, so the
+    first requests of a new worker don't have to.
+    """
+    from django.template.loader import get_template
+
+    for directory in settings.TEMPLATE_DIRS:
+        for root, dirs, files in os.walk(directory):
+            for filename in files:
+                name = os.path.relpath(os.path.join(root, filename), directory)
+                try:
+                    get_template(name)
+                except Exception:
+                    # Broken templates fail on their first use as before
+                    pass
+
+
+if not settings.DEBUG:
+    warm_up_templates()
+
 # Apply WSGI middleware here.
 # from helloworld.wsgi import HelloWorldApplication
 # application = HelloWorldApplication(application)